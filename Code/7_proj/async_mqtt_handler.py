@@ -0,0 +1,154 @@
+import asyncio
+import paho.mqtt.client as mqtt
+from mqtt_handler import MQTTHandler
+
+class AsyncMQTTHandler(MQTTHandler):
+    """
+    asyncio variant of MQTTHandler.
+
+    Instead of one loop_start() network thread per client, the paho socket is
+    registered with a shared asyncio event loop (add_reader/add_writer), so a
+    single process can host any number of vessel roles. publish(), route()
+    and subscribe() keep the MQTTHandler signatures and also accept
+    coroutine callbacks/handlers.
+    """
+
+    def __init__(self, role, loop=None):
+        # Load configuration and TLS settings but let the event loop drive the network
+        super().__init__(role, auto_connect=False)
+        self.loop = loop
+        self.misc_task = None
+        self.pending_tasks = set()
+        self.connected = None
+        self.closing = False
+        self.reconnect_delay = 1  # Seconds before the next reconnect attempt, doubled up to 60 on failures
+
+        # Hook paho's socket callbacks so the event loop watches the MQTT socket
+        self.client.on_socket_open = self.on_socket_open
+        self.client.on_socket_close = self.on_socket_close
+        self.client.on_socket_register_write = self.on_socket_register_write
+        self.client.on_socket_unregister_write = self.on_socket_unregister_write
+        self.client.on_connect = self.on_connect
+
+    async def start(self, timeout=10):
+        # Connect to the broker without blocking the shared event loop
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        self.connected = self.loop.create_future()
+
+        try:
+            print(f"Connecting to {self.broker}:{self.port} ...")
+            # DNS lookup and TCP/TLS handshake happen in the default executor
+            await self.loop.run_in_executor(None, self.client.connect, self.broker, self.port, 60)
+            await asyncio.wait_for(self.connected, timeout)
+            print(f"Successfully connected to MQTT broker as {self.role}")
+        except Exception as e:
+            print(f"Failed to connect to MQTT broker: {e}")
+            raise
+
+    def on_connect(self, client, userdata, flags, reason_code, properties):
+        if self.connected is None:
+            return
+        if self.connected.done():
+            # Reconnected by misc_loop(): the broker may have dropped the session, so subscribe again
+            if not reason_code.is_failure:
+                print(f"Reconnected to MQTT broker as {self.role}")
+                self.reconnect_delay = 1
+                self.resubscribe()
+            return
+        if reason_code.is_failure:
+            self.connected.set_exception(ConnectionError(f"MQTT connection refused: {reason_code}"))
+        else:
+            self.connected.set_result(True)
+
+    def on_socket_open(self, client, userdata, sock):
+        # paho may call this from the executor thread used by start()
+        self.loop.call_soon_threadsafe(self._watch_socket, sock)
+
+    def _watch_socket(self, sock):
+        self.loop.add_reader(sock, self.client.loop_read)
+        if self.misc_task is None:
+            self.misc_task = self.loop.create_task(self.misc_loop())
+
+    def on_socket_close(self, client, userdata, sock):
+        self.call_in_loop(self.loop.remove_reader, sock)
+
+    def on_socket_register_write(self, client, userdata, sock):
+        self.call_in_loop(self.loop.add_writer, sock, self.client.loop_write)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self.call_in_loop(self.loop.remove_writer, sock)
+
+    def call_in_loop(self, callback, *args):
+        # On the loop thread run it now: paho closes the socket right after on_socket_close returns
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self.loop:
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    async def misc_loop(self):
+        # Keepalive pings, retry timers and reconnects, normally handled by the loop_start() thread
+        try:
+            while not self.closing:
+                if self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+                    await asyncio.sleep(1)
+                    continue
+                # Connection lost: reconnect with backoff; on_socket_open() registers the new socket
+                print(f"MQTT connection lost for {self.role}, reconnecting in {self.reconnect_delay} s")
+                await asyncio.sleep(self.reconnect_delay)
+                self.reconnect_delay = min(self.reconnect_delay * 2, 60)
+                try:
+                    await self.loop.run_in_executor(None, self.client.reconnect)
+                except Exception as e:
+                    print(f"Reconnect failed for {self.role}: {e}")
+        except asyncio.CancelledError:
+            pass
+
+    def subscribe(self, topic_names, callback=None, qos=None):
+        # Coroutine callbacks are scheduled as tasks on the shared loop
+        if callback is not None and asyncio.iscoroutinefunction(callback):
+            callback = self.wrap_async_callback(callback)
+        super().subscribe(topic_names, callback, qos)
+
+    def route(self, topic_names, handler, decoder=None, qos=None):
+        # Coroutine route handlers are scheduled the same way
+        if asyncio.iscoroutinefunction(handler):
+            handler = self.wrap_async_callback(handler)
+        super().route(topic_names, handler, decoder, qos)
+
+    def wrap_async_callback(self, callback):
+        def dispatch(*args):
+            task = self.loop.create_task(self.run_callback(callback, *args))
+            # Keep a reference until the task finishes so it is not garbage collected
+            self.pending_tasks.add(task)
+            task.add_done_callback(self.pending_tasks.discard)
+        return dispatch
+
+    async def run_callback(self, callback, *args):
+        try:
+            await callback(*args)
+        except Exception as e:
+            # Both callback signatures end with the paho message
+            print(f"Error in MQTT callback for topic {args[-1].topic}: {e}")
+
+    def disconnect(self):
+        # Same synchronous signature as MQTTHandler.disconnect(); callbacks still running are not waited for
+        self.closing = True
+        self.flush()
+        if self.journal is not None:
+            self.journal.close()
+        self.client.disconnect()
+        if self.misc_task is not None:
+            self.call_in_loop(self.misc_task.cancel)
+            self.misc_task = None
+        print(f"MQTT connection closed for {self.role}.")
+
+    async def aclose(self):
+        # Let in-flight callbacks finish, then close the connection
+        if self.pending_tasks:
+            await asyncio.gather(*self.pending_tasks, return_exceptions=True)
+        self.disconnect()
@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import threading
+import time
+from math import radians, sin, cos
+import numpy as np
+from dotenv import load_dotenv
+from geodesy import METERS_PER_DEGREE, destination_point, fleet_matrices
+from sample_clock import SampleClock
+from topic_router import vessel_position_handler
+
+# Load environment variables from the .env file located one directory above
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+class FleetState:
+    """
+    Latest position and velocity of every vessel, in NumPy columns.
+
+    One row per vessel, keyed by its position topic and overwritten by each
+    sample, so the engine reads the whole fleet without walking dicts.
+    Columns double in size when the fleet outgrows them. Updates arrive on
+    the MQTT thread and snapshots are taken on the engine's.
+    """
+
+    def __init__(self, capacity=64):
+        self.index = {}  # vessel -> row
+        self.names = []
+        self.lat = np.zeros(capacity)
+        self.lon = np.zeros(capacity)
+        self.v_north = np.zeros(capacity)
+        self.v_east = np.zeros(capacity)
+        self.time = np.zeros(capacity)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def grow(self):
+        for column in ('lat', 'lon', 'v_north', 'v_east', 'time'):
+            values = getattr(self, column)
+            setattr(self, column, np.concatenate([values, np.zeros(len(values))]))
+
+    def update(self, vessel, sample, sample_time=None):
+        # sample_time must be on this side's clock (see SampleClock); the time of receipt if not given
+        if sample_time is None:
+            sample_time = time.time()
+        heading = sample.get('heading')
+        speed = sample.get('ground_speed') or 0.0
+
+        with self.lock:
+            row = self.index.get(vessel)
+            if row is None:
+                row = len(self.names)
+                if row == len(self.lat):
+                    self.grow()
+                self.index[vessel] = row
+                self.names.append(vessel)
+            self.lat[row] = sample['latitude']
+            self.lon[row] = sample['longitude']
+            # Without a heading the vessel is treated as stationary
+            self.v_north[row] = speed * cos(radians(heading)) if heading is not None else 0.0
+            self.v_east[row] = speed * sin(radians(heading)) if heading is not None else 0.0
+            self.time[row] = sample_time
+
+    def snapshot(self):
+        # (names, lat, lon, v_north, v_east, time) copied under the lock
+        with self.lock:
+            n = len(self.names)
+            return (list(self.names), self.lat[:n].copy(), self.lon[:n].copy(),
+                    self.v_north[:n].copy(), self.v_east[:n].copy(), self.time[:n].copy())
+
+class CollisionRiskEngine:
+    """
+    Closest point of approach (CPA) and time to CPA for every pair of vessels.
+
+    Each tick extrapolates the fleet to the same instant, takes every
+    pair's separation from fleet_matrices() and evaluates all N(N-1)/2
+    pairs in one vectorized pass under constant velocity. Pairs whose CPA is within `cpa_threshold` meters
+    inside the next `horizon` seconds are returned as alerts, most urgent
+    first. Vessels silent for more than `max_age` seconds are left out.
+    """
+
+    def __init__(self, fleet, cpa_threshold=20.0, horizon=120.0, max_age=30.0):
+        self.fleet = fleet
+        self.cpa_threshold = cpa_threshold
+        self.horizon = horizon
+        self.max_age = max_age
+        self.pairs = {}  # Cached upper-triangle indices per fleet size
+
+        # Counters to measure the engine
+        self.ticks = 0
+        self.pairs_checked = 0
+        self.alerts_raised = 0
+
+    def pair_indices(self, n):
+        if n not in self.pairs:
+            self.pairs[n] = np.triu_indices(n, 1)
+        return self.pairs[n]
+
+    def assess(self, now=None):
+        # Ranked list of alerts for the fleet at `now`
+        now = time.time() if now is None else now
+        names, lat, lon, v_north, v_east, sample_time = self.fleet.snapshot()
+        self.ticks += 1
+
+        active = np.flatnonzero(now - sample_time <= self.max_age)
+        if len(active) < 2:
+            return []
+        lat, lon = lat[active], lon[active]
+        v_north, v_east = v_north[active], v_east[active]
+
+        # Every vessel at the same instant (a few seconds of motion, so a flat step is enough)
+        age = now - sample_time[active]
+        lat = lat + v_north * age / METERS_PER_DEGREE
+        lon = lon + v_east * age / (METERS_PER_DEGREE * np.cos(np.radians(lat)))
+
+        # Separation of each pair as east/north metres from its great-circle distance and bearing
+        distances, bearings = fleet_matrices(lat, lon)
+        i, j = self.pair_indices(len(active))
+        distance = distances[i, j]
+        bearing = np.radians(bearings[i, j])
+        dx, dy = distance * np.sin(bearing), distance * np.cos(bearing)
+        dvx, dvy = v_east[j] - v_east[i], v_north[j] - v_north[i]
+        closing = dvx * dvx + dvy * dvy
+
+        # Time of closest approach, 0 for pairs moving apart or keeping their distance
+        tcpa = np.zeros(len(i))
+        np.divide(-(dx * dvx + dy * dvy), closing, out=tcpa, where=closing > 1e-9)
+        np.clip(tcpa, 0.0, None, out=tcpa)
+        cpa = np.hypot(dx + dvx * tcpa, dy + dvy * tcpa)
+        self.pairs_checked += len(i)
+
+        risky = np.flatnonzero((cpa < self.cpa_threshold) & (tcpa <= self.horizon))
+        if len(risky) == 0:
+            return []
+        # Soonest first, closest first among equally soon (e.g. already at CPA)
+        risky = risky[np.lexsort((cpa[risky], tcpa[risky]))]
+        self.alerts_raised += len(risky)
+        return [
+            {
+                'vessels': [names[active[i[k]]], names[active[j[k]]]],
+                'cpa': round(float(cpa[k]), 1),
+                'tcpa': round(float(tcpa[k]), 1),
+                'distance': round(float(d), 1)
+            }
+            for k, d in zip(risky, distance[risky])
+        ]
+
+    def stats(self):
+        return {
+            'vessels': len(self.fleet),
+            'ticks': self.ticks,
+            'pairs_checked': self.pairs_checked,
+            'alerts': self.alerts_raised
+        }
+
+# Publisher times are mapped onto the local clock, so a vessel with a skewed clock is still assessed
+on_vessel_position = vessel_position_handler(
+    lambda userdata, vessel, sample, sample_time: userdata['fleet'].update(vessel, sample, sample_time))
+
+def random_fleet(n, radius=500.0, seed=0, center=(37.4397, 24.9451)):
+    # n vessels with random positions within radius metres and speeds up to 4 m/s, for benchmarks
+    rng = np.random.default_rng(seed)
+    fleet = FleetState()
+    lats, lons = destination_point(center[0], center[1], rng.uniform(0, 360, n), radius * np.sqrt(rng.uniform(0, 1, n)))
+    now = time.time()
+    for k in range(n):
+        fleet.update(f"vessel{k}/position", {
+            'latitude': float(lats[k]), 'longitude': float(lons[k]),
+            'heading': float(rng.uniform(0, 360)), 'ground_speed': float(rng.uniform(0, 4))
+        }, now)
+    return fleet
+
+def benchmark(sizes, ticks=200):
+    # CPU time per assess() call against fleet size
+    print(f"{'vessels':>8} {'pairs':>8} {'ms/tick':>9} {'max Hz':>9} {'alerts':>7}")
+    for n in sizes:
+        engine = CollisionRiskEngine(random_fleet(n))
+        alerts = engine.assess()
+        start = time.process_time()
+        for _ in range(ticks):
+            engine.assess()
+        per_tick = (time.process_time() - start) / ticks
+        print(f"{n:>8} {n * (n - 1) // 2:>8} {per_tick * 1000:>9.2f} {1 / per_tick:>9.0f} {len(alerts):>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Fleet collision-risk monitor (CPA/TCPA over all vessel pairs)')
+    parser.add_argument('--role', default='scout', help='MQTT credentials to connect with (default: scout)')
+    parser.add_argument('--topics', nargs='+', default=['+/position'],
+                        help='Position topics or filters to track (default: +/position)')
+    parser.add_argument('--rate', type=float, default=10, help='Assessments per second (default: 10)')
+    parser.add_argument('--cpa', type=float, default=20, help='Alert when vessels pass closer than this (m)')
+    parser.add_argument('--horizon', type=float, default=120, help='Look-ahead for the CPA (s)')
+    parser.add_argument('--benchmark', type=int, nargs='*', metavar='VESSELS',
+                        help='Time the engine on random fleets of these sizes instead of connecting')
+    args = parser.parse_args()
+
+    if args.benchmark is not None:
+        benchmark(args.benchmark or [10, 50, 100, 200, 500])
+        return
+
+    from mqtt_handler import MQTTHandler
+    from telemetry_codec import decode_samples
+
+    alert_topic = os.getenv('COLLISION_ALERT_TOPIC', 'fleet/collision_alerts')
+    fleet = FleetState()
+    engine = CollisionRiskEngine(fleet, args.cpa, args.horizon)
+    mqtt_handler = MQTTHandler(args.role)
+    mqtt_handler.client.user_data_set({
+        'fleet': fleet,
+        'sample_clock': SampleClock(),  # Maps each vessel's timestamps onto this clock
+        'max_skew': engine.max_age      # Clocks further off than this would have dropped the vessel as stale
+    })
+    mqtt_handler.route(args.topics, on_vessel_position, decode_samples)
+
+    print(f"Collision monitor running at {args.rate} Hz, alerts on {alert_topic}")
+    try:
+        previous_alerts = []
+        next_tick = time.monotonic()
+        while True:
+            alerts = engine.assess()
+            # Publish while there is a risk, plus one empty list to clear it
+            if alerts or previous_alerts:
+                mqtt_handler.client.publish(alert_topic, json.dumps({
+                    'type': 'collision_alerts',
+                    'time_ms': int(time.time() * 1000),
+                    'alerts': alerts
+                }), qos=1)
+                for alert in alerts[:3]:
+                    print(f"Collision risk {alert['vessels'][0]} / {alert['vessels'][1]}: "
+                          f"CPA {alert['cpa']} m in {alert['tcpa']} s (now {alert['distance']} m)")
+            previous_alerts = alerts
+            next_tick = max(next_tick + 1 / args.rate, time.monotonic())
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+
+    except KeyboardInterrupt:
+        print("\nShutting down collision monitor...")
+
+    finally:
+        print(f"Collision risk: {engine.stats()}")
+        mqtt_handler.disconnect()
+
+if __name__ == "__main__":
+    main()
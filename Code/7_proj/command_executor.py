@@ -0,0 +1,73 @@
+import queue
+import threading
+import time
+
+class CommandExecutor:
+    """
+    Runs vehicle commands on a dedicated worker thread.
+
+    MQTT callbacks only call submit(), which never blocks: arming and mode
+    changes wait on the worker instead of paho's network thread, so scout
+    positions and keepalives keep flowing. Each command's outcome (queued,
+    completed, timeout, failed or rejected) is passed to `report`.
+    """
+
+    def __init__(self, execute, report, max_pending=8, timeout=30):
+        self.execute = execute  # execute(command, timeout)
+        self.report = report    # report(status_dict)
+        self.timeout = timeout
+        self.commands = queue.Queue(maxsize=max_pending)
+        self.worker = threading.Thread(target=self.run, name="command-executor", daemon=True)
+
+    def start(self):
+        self.worker.start()
+
+    def stop(self, wait=5):
+        # A None sentinel ends the worker after the commands already queued
+        try:
+            self.commands.put(None, timeout=wait)
+        except queue.Full:
+            pass
+        self.worker.join(wait)
+
+    def submit(self, command):
+        # Enqueue without blocking; a full queue rejects the command instead of stalling the caller
+        try:
+            self.commands.put_nowait((command, time.time()))
+        except queue.Full:
+            print(f"Command queue full, rejecting command: {command}")
+            self.send_report(command, "rejected", error="command queue full")
+            return False
+        self.send_report(command, "queued", pending=self.commands.qsize())
+        return True
+
+    def run(self):
+        while True:
+            item = self.commands.get()
+            if item is None:
+                break
+            command, submitted_time = item
+            start_time = time.time()
+            try:
+                self.execute(command, self.timeout)
+                status, error = "completed", None
+            except TimeoutError as e:
+                status, error = "timeout", str(e)
+            except Exception as e:
+                status, error = "failed", str(e)
+
+            if error:
+                print(f"Command {command} {status}: {error}")
+            self.send_report(
+                command, status, error=error,
+                queued_time=round(start_time - submitted_time, 3),
+                duration=round(time.time() - start_time, 3)
+            )
+
+    def send_report(self, command, status, **details):
+        report = {"type": "command_status", "command": command, "status": status}
+        report.update({key: value for key, value in details.items() if value is not None})
+        try:
+            self.report(report)
+        except Exception as e:
+            print(f"Failed to report command status: {e}")
@@ -0,0 +1,57 @@
+import time
+from geodesy import haversine_scalar
+from scout_tracker import ScoutTracker
+
+class DeadReckoningPublisher:
+    """
+    Adaptive publisher that suppresses samples subscribers can already predict.
+
+    A sample is published only when the real position is more than
+    `threshold` meters from what subscribers believe, or when nothing has
+    been published for `max_silence` seconds. Their belief is modelled with
+    the same ScoutTracker team.py runs, fed with exactly the published
+    samples, so the Kalman blending of each fix is accounted for. The two
+    only drift apart when a published sample is lost (QoS 0) or a
+    subscriber tunes its tracker differently, and max_silence bounds that.
+    """
+
+    def __init__(self, mqtt_handler, threshold=10, max_silence=30):
+        self.mqtt_handler = mqtt_handler
+        self.threshold = threshold
+        self.max_silence = max_silence
+        self.model = ScoutTracker()
+        self.last_publish_time = None
+
+        # Counters to measure the traffic saved
+        self.published = 0
+        self.suppressed = 0
+
+    def should_publish(self, telemetry_data, now):
+        if self.last_publish_time is None or now - self.last_publish_time >= self.max_silence:
+            return True
+        predicted_lat, predicted_lon, _ = self.model.predict(now)
+        error = haversine_scalar(predicted_lat, predicted_lon, telemetry_data['latitude'], telemetry_data['longitude'])
+        return error > self.threshold
+
+    def offer(self, telemetry_data, qos=0):
+        # Publish the sample if needed; returns the published payload or None when suppressed
+        now = time.time()
+        if not self.should_publish(telemetry_data, now):
+            self.suppressed += 1
+            return None
+
+        self.model.update(telemetry_data, now)
+        self.last_publish_time = now
+        self.published += 1
+        return self.mqtt_handler.publish(telemetry_data, qos=qos)
+
+    def suppression_ratio(self):
+        total = self.published + self.suppressed
+        return self.suppressed / total if total else 0
+
+    def stats(self):
+        return {
+            'published': self.published,
+            'suppressed': self.suppressed,
+            'suppression_ratio': round(self.suppression_ratio(), 3)
+        }
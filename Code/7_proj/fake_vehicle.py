@@ -0,0 +1,291 @@
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import time
+from math import radians, degrees, sin, cos, atan2, hypot, exp
+from geodesy import destination_point_scalar, haversine_scalar, initial_bearing_scalar
+from pymavlink import mavutil
+from tlog_replay import TlogVehicle, ReplayMode
+
+HOME = (37.4397, 24.9451)  # Syros port, as in the Project 8 patrol
+
+class VirtualClock:
+    # Simulated time in seconds; pass clock.time wherever time.time would be used
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def advance(self, dt):
+        self.now += dt
+
+class FakeCommands:
+    """
+    Mission store with the parts of DroneKit's CommandSequence that MissionManager uses.
+
+    add() and clear() edit a local copy that upload() makes active; `next` is
+    the index of the waypoint being navigated in AUTO.
+    """
+
+    def __init__(self):
+        self.pending = []
+        self.mission = []
+        self.next = 0
+
+    def clear(self):
+        self.pending = []
+
+    def add(self, command):
+        self.pending.append(command)
+
+    def upload(self, timeout=None):
+        self.mission = list(self.pending)
+        self.next = 0
+
+    def download(self):
+        self.pending = list(self.mission)
+
+    def wait_ready(self, **kwargs):
+        return True
+
+    @property
+    def count(self):
+        return len(self.mission)
+
+    def __len__(self):
+        return len(self.mission)
+
+    def __iter__(self):
+        return iter(self.mission)
+
+    def __getitem__(self, index):
+        return self.mission[index]
+
+class FakeVehicle(TlogVehicle):
+    """
+    SITL stand-in: a boat with first-order kinematics on a virtual clock.
+
+    Ground speed approaches its target with time constant `time_constant`
+    and heading turns toward the navigation target at up to `turn_rate`
+    deg/s. GUIDED steers to the last simple_goto() or streamed position
+    target (adding its velocity feed-forward), AUTO through the uploaded
+    mission, and any other mode (or disarmed) brings the boat to a stop. It
+    keeps TlogVehicle's attribute/message listener API and command records,
+    so VesselController, MissionManager and the transition futures run on it
+    unchanged.
+    """
+
+    def __init__(self, lat=HOME[0], lon=HOME[1], heading=0.0, clock=None,
+                 cruise_speed=3.0, time_constant=2.0, turn_rate=30.0, acceptance_radius=2.0):
+        super().__init__()
+        self.clock = clock or VirtualClock()
+        self.cruise_speed = cruise_speed
+        self.time_constant = time_constant
+        self.turn_rate = turn_rate
+        self.acceptance_radius = acceptance_radius
+
+        self._mode = ReplayMode('MANUAL')
+        self.heading = heading
+        self.groundspeed = 0.0
+        self.commands = FakeCommands()
+        self.target = None
+        self.target_velocity = None  # (v_north, v_east) feed-forward from a streamed position target
+        self.distance_travelled = 0.0
+        self.set_position(lat, lon)
+
+    def set_position(self, lat, lon):
+        for frame in (self.location.global_frame, self.location.global_relative_frame):
+            frame.lat = lat
+            frame.lon = lon
+            frame.alt = 0.0
+
+    def simple_goto(self, location, airspeed=None, groundspeed=None):
+        super().simple_goto(location, airspeed, groundspeed)
+        self.target = (location.lat, location.lon)
+        self.target_velocity = None
+        if groundspeed:
+            self.cruise_speed = groundspeed
+
+    def send_mavlink(self, message):
+        super().send_mavlink(message)
+        if message.get_type() == 'SET_POSITION_TARGET_GLOBAL_INT':
+            self.target = (message.lat_int / 1e7, message.lon_int / 1e7)
+            velocity_ignored = message.type_mask & mavutil.mavlink.POSITION_TARGET_TYPEMASK_VX_IGNORE
+            self.target_velocity = None if velocity_ignored else (message.vx, message.vy)
+
+    def navigation_target(self):
+        # Where the autopilot is steering in the current mode, or None to hold position
+        if self._mode.name == 'GUIDED':
+            return self.target
+        if self._mode.name == 'AUTO' and self.commands.next < self.commands.count:
+            waypoint = self.commands[self.commands.next]
+            return waypoint.x, waypoint.y
+        return None
+
+    def step(self, dt):
+        # Advance the motion model by dt seconds (the clock is advanced by the caller)
+        lat = self.location.global_frame.lat
+        lon = self.location.global_frame.lon
+        desired_heading = self.heading
+        target_speed = 0.0
+
+        target = self.navigation_target() if self._armed else None
+        if target is not None:
+            distance = haversine_scalar(lat, lon, target[0], target[1])
+            if distance <= self.acceptance_radius:
+                if self._mode.name == 'AUTO':
+                    self.commands.next += 1
+            else:
+                desired_heading = initial_bearing_scalar(lat, lon, target[0], target[1])
+                # Slow down on the approach instead of overshooting the target
+                target_speed = min(self.cruise_speed, distance / self.time_constant)
+            if self._mode.name == 'GUIDED' and self.target_velocity is not None:
+                # Streamed target: velocity feed-forward plus a correction toward the position
+                v_north = self.target_velocity[0] + distance * cos(radians(desired_heading)) / self.time_constant
+                v_east = self.target_velocity[1] + distance * sin(radians(desired_heading)) / self.time_constant
+                desired_heading = degrees(atan2(v_east, v_north)) % 360
+                target_speed = min(self.cruise_speed, hypot(v_north, v_east))
+
+        heading_error = (desired_heading - self.heading + 180) % 360 - 180
+        max_turn = self.turn_rate * dt
+        self.heading = (self.heading + max(-max_turn, min(max_turn, heading_error))) % 360
+        self.groundspeed += (target_speed - self.groundspeed) * (1 - exp(-dt / self.time_constant))
+
+        if self.groundspeed > 0:
+            lat, lon = destination_point_scalar(lat, lon, self.heading, self.groundspeed * dt)
+            self.set_position(lat, lon)
+            self.distance_travelled += self.groundspeed * dt
+
+        if self.attribute_listeners:
+            self.notify_attribute_listeners('location.global_frame', self.location.global_frame)
+            self.notify_attribute_listeners('location.global_relative_frame', self.location.global_relative_frame)
+            self.notify_attribute_listeners('heading', self.heading)
+            self.notify_attribute_listeners('groundspeed', self.groundspeed)
+
+def advance(clock, vehicles, dt):
+    # Step every vehicle sharing a clock, then move the clock forward
+    for vehicle in vehicles:
+        vehicle.step(dt)
+    clock.advance(dt)
+
+def follow_scenario(rng, duration=120.0, dt=1.0, telemetry_interval=1.0, converge_radius=10.0,
+                    predict=False, gps_noise=0.0, scout_turn_interval=60.0, stream_rate=None):
+    # One scout/follower run driven through VesselController.follow_scout(); returns its metrics
+    from vessel_controller import VesselController
+    from scout_tracker import ScoutTracker
+    from team import intercept_point
+
+    clock = VirtualClock()
+    scout_heading = rng.uniform(0, 360)
+    scout = FakeVehicle(heading=scout_heading, clock=clock, cruise_speed=rng.uniform(0.5, 3.0))
+    scout.set_mode('GUIDED')
+    scout.set_armed(True)
+    scout.target = destination_point_scalar(HOME[0], HOME[1], scout_heading, 5000)  # 5 km away
+
+    start_lat, start_lon = destination_point_scalar(HOME[0], HOME[1], rng.uniform(0, 360), rng.uniform(50, 300))
+    follower = FakeVehicle(start_lat, start_lon, heading=rng.uniform(0, 360), clock=clock, cruise_speed=4.0)
+    follower.set_mode('GUIDED')
+    follower.set_armed(True)
+    vessel_controller = VesselController('TEAM1', vehicle=follower, clock=clock.time)
+    vessel_controller.following = True
+    scout_tracker = ScoutTracker() if predict else None
+    # Streamed targets are sent from this loop on the virtual clock instead of the sender thread
+    position_streamer = vessel_controller.start_streaming(stream_rate, run_thread=False) if stream_rate else None
+    next_target = 0.0
+
+    converged_at = None
+    tracking_errors = []
+    next_telemetry = 0.0
+    next_turn = scout_turn_interval
+    while clock.now < duration:
+        scout_location = scout.location.global_frame
+        if clock.now >= next_turn:
+            # The scout changes course now and then, so predictions have to recover
+            scout.target = destination_point_scalar(scout_location.lat, scout_location.lon, rng.uniform(0, 360), 5000)
+            next_turn += scout_turn_interval
+        if clock.now >= next_telemetry:
+            # Reported fix, with optional GPS noise on the position
+            sample = {
+                'latitude': scout_location.lat, 'longitude': scout_location.lon,
+                'heading': scout.heading, 'ground_speed': scout.groundspeed
+            }
+            if gps_noise:
+                sample['latitude'], sample['longitude'] = destination_point_scalar(
+                    sample['latitude'], sample['longitude'], rng.uniform(0, 360), abs(rng.gauss(0, gps_noise)))
+            if scout_tracker is not None:
+                scout_tracker.update(sample, clock.now)
+                vessel_controller.follow_scout(*intercept_point(vessel_controller, scout_tracker, clock.now))
+            else:
+                vessel_controller.follow_scout(sample['latitude'], sample['longitude'], sample['ground_speed'], sample['heading'])
+            next_telemetry += telemetry_interval
+        # Gotos held back by the shaper go out once it has a token again
+        vessel_controller.flush_goto()
+        while position_streamer is not None and clock.now >= next_target:
+            position_streamer.send_target()
+            next_target += 1 / stream_rate
+        advance(clock, (scout, follower), dt)
+
+        distance = haversine_scalar(
+            scout.location.global_frame.lat, scout.location.global_frame.lon,
+            follower.location.global_frame.lat, follower.location.global_frame.lon
+        )
+        if converged_at is None and distance < converge_radius:
+            converged_at = clock.now
+        if clock.now >= duration / 2:
+            tracking_errors.append(distance)
+
+    return {
+        'gotos': len(follower.goto_commands),
+        'gotos_suppressed': vessel_controller.goto_shaper.suppressed + vessel_controller.goto_shaper.merged,
+        'uplink_bytes': sum(len(message.get_msgbuf()) for message in follower.sent_messages),
+        'mode_changes': len(follower.mode_requests),
+        'converged_at': converged_at,
+        'tracking_error': statistics.mean(tracking_errors) if tracking_errors else None,
+        'distance_travelled': follower.distance_travelled
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Run deterministic follow scenarios on fake vehicles')
+    parser.add_argument('--scenarios', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=120, help='Simulated seconds per scenario')
+    parser.add_argument('--dt', type=float, default=1.0, help='Simulation step in seconds')
+    parser.add_argument('--telemetry-interval', type=float, default=1.0, help='Seconds between scout positions')
+    parser.add_argument('--gps-noise', type=float, default=0.0, help='Standard deviation of reported scout positions (m)')
+    parser.add_argument('--predict', action='store_true', help='Aim at the ScoutTracker intercept point instead of the last fix')
+    parser.add_argument('--position-targets', type=float, metavar='HZ',
+                        help='Stream SET_POSITION_TARGET_GLOBAL_INT at HZ instead of goto commands')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    start_time = time.perf_counter()
+    # follow_scout() reports to stdout; keep it out of the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(args.scenarios):
+            results.append(follow_scenario(rng, args.duration, args.dt, args.telemetry_interval,
+                                           predict=args.predict, gps_noise=args.gps_noise,
+                                           stream_rate=args.position_targets))
+    elapsed = time.perf_counter() - start_time
+
+    gotos = [result['gotos'] for result in results]
+    converged = [result['converged_at'] for result in results if result['converged_at'] is not None]
+    print(f"{args.scenarios} scenarios of {args.duration:.0f} s in {elapsed:.2f} s "
+          f"({args.scenarios / elapsed:.0f} scenarios/s)")
+    print(f"Goto commands per scenario: mean {statistics.mean(gotos):.1f}, max {max(gotos)}, "
+          f"suppressed or merged {statistics.mean(result['gotos_suppressed'] for result in results):.1f}")
+    if args.position_targets:
+        print(f"Position target uplink: mean {statistics.mean(result['uplink_bytes'] for result in results) / args.duration:.0f} bytes/s")
+    print(f"Mode changes per scenario: mean {statistics.mean(result['mode_changes'] for result in results):.1f}")
+    print(f"Tracking error over the second half: mean {statistics.mean(result['tracking_error'] for result in results):.1f} m")
+    if converged:
+        print(f"Converged within 10 m: {len(converged)}/{len(results)}, "
+              f"mean {statistics.mean(converged):.1f} s, median {statistics.median(converged):.1f} s")
+    else:
+        print("No scenario converged within 10 m")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import asyncio
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from async_mqtt_handler import AsyncMQTTHandler
+from vessel_controller import VesselController
+from team import handle_command, on_scout_position
+from telemetry_codec import decode_samples
+from topic_router import decode_command
+
+# Load environment variables from the .env file located one directory above
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+TELEMETRY_INTERVAL = 5  # Seconds between telemetry publications
+VEHICLE_WORKERS_PER_ROLE = 2  # Vehicle I/O threads per hosted role (a connect or command plus one queued command)
+
+async def on_team_command(command, userdata, msg):
+    # Arming and mode changes block, so run them off the event loop on the vehicle I/O pool.
+    # The timeout bounds how long an unacknowledged transition can hold one of its threads.
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(userdata['vehicle_executor'], handle_command, command,
+                               userdata['vessel_controller'], userdata['command_timeout'])
+
+async def publish_telemetry(role, mqtt_handler, vessel_controller):
+    # Periodic telemetry publication, one task per vessel instead of one thread
+    while True:
+        try:
+            telemetry_data = vessel_controller.get_telemetry()
+            published_payload = mqtt_handler.publish(telemetry_data, qos=0)
+            if published_payload is not None:
+                print(f"[{role}] {published_payload}")
+        except Exception as e:
+            print(f"[{role}] An error occurred in the telemetry loop: {e}")
+        await asyncio.sleep(TELEMETRY_INTERVAL)
+
+async def start_role(role, vehicle_executor, command_timeout):
+    # dronekit.connect(wait_ready=True) blocks, so connect vehicles on the vehicle I/O pool.
+    # MQTT connects and reconnects keep the default executor, so stuck vehicle calls cannot starve them.
+    loop = asyncio.get_running_loop()
+    vessel_controller = await loop.run_in_executor(vehicle_executor, VesselController, role)
+    mqtt_handler = AsyncMQTTHandler(role)
+    await mqtt_handler.start()
+
+    if role.lower().startswith('team'):
+        mqtt_handler.client.user_data_set({
+            'vessel_controller': vessel_controller,
+            'vehicle_executor': vehicle_executor,
+            'command_timeout': command_timeout
+        })
+        mqtt_handler.route('SCOUT_POSITION_TOPIC', on_scout_position, decode_samples)
+        mqtt_handler.route(f'{role.upper()}_COMMANDS', on_team_command, decode_command)
+
+    return mqtt_handler, vessel_controller
+
+async def run_fleet(roles, command_timeout=30):
+    # Bring every role up concurrently on the same event loop
+    vehicle_executor = ThreadPoolExecutor(max_workers=VEHICLE_WORKERS_PER_ROLE * len(roles),
+                                          thread_name_prefix='vehicle-io')
+    try:
+        vessels = await asyncio.gather(*(start_role(role, vehicle_executor, command_timeout) for role in roles))
+    except BaseException:
+        vehicle_executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    print(f"Fleet ready: {', '.join(role.upper() for role in roles)}")
+
+    try:
+        await asyncio.gather(*(
+            publish_telemetry(role, mqtt_handler, vessel_controller)
+            for role, (mqtt_handler, vessel_controller) in zip(roles, vessels)
+        ))
+    finally:
+        # Ensure both MQTT and vehicle connections are closed before exiting
+        for mqtt_handler, vessel_controller in vessels:
+            try:
+                vessel_controller.close_connection()
+                await mqtt_handler.aclose()
+            except Exception:
+                pass  # Ignore errors during cleanup
+        vehicle_executor.shutdown(wait=False, cancel_futures=True)
+
+def main():
+    # Set up command-line argument parsing
+    parser = argparse.ArgumentParser(description='Run several vessel roles in a single asyncio event loop')
+    parser.add_argument('roles', nargs='+',
+                       help='Vessel roles to host, e.g. scout team1 team2 team3')
+    parser.add_argument('--command-timeout', type=float, default=30, metavar='SECONDS',
+                       help='Give up on arming or mode changes after SECONDS (default: 30)')
+    args = parser.parse_args()
+
+    print(f"Starting fleet: {', '.join(args.roles)}")
+
+    try:
+        asyncio.run(run_fleet(args.roles, args.command_timeout))
+    except KeyboardInterrupt:
+        print("\nShutting down fleet...")
+    except Exception as e:
+        print(f"Error: {e}")
+    print("All connections closed. Exiting.")
+
+if __name__ == "__main__":
+    main()
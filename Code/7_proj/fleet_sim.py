@@ -0,0 +1,181 @@
+import argparse
+import contextlib
+import io
+import random
+import time
+import tracemalloc
+from geodesy import destination_point_scalar, haversine_scalar
+from fake_vehicle import FakeVehicle, VirtualClock, HOME
+from team import on_scout_position
+from telemetry_codec import encode_payload, decode_samples, ENCODING_JSON
+from topic_router import TopicRouter
+from vessel_controller import VesselController
+
+class BusMessage:
+    # Same fields the route handlers read from a paho MQTTMessage
+    __slots__ = ('topic', 'payload')
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+class InMemoryBus:
+    """
+    Broker-less publish/subscribe for simulations.
+
+    Messages are dispatched synchronously through a TopicRouter, so routes,
+    decoders and handlers behave as they do behind MQTTHandler, including
+    one decode per message however many vessels subscribe to a topic.
+    """
+
+    def __init__(self):
+        self.router = TopicRouter()
+        self.published = 0
+        self.delivered = 0
+
+    def route(self, topic_filter, handler, decoder=None, userdata=None):
+        # Handlers keep the routed signature handler(value, userdata, msg), each with its own userdata
+        def deliver(value, _, msg):
+            self.delivered += 1
+            handler(value, userdata, msg)
+        self.router.add(topic_filter, deliver, decoder)
+
+    def publish(self, topic, payload):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self.published += 1
+        self.router.dispatch(None, None, BusMessage(topic, payload))
+
+class SimulatedScout:
+    # A scout wandering between random waypoints and publishing its telemetry on the bus
+    def __init__(self, index, clock, rng, bus, encoding):
+        self.topic = f"fleet/scout{index}/position"
+        self.rng = rng
+        self.bus = bus
+        self.encoding = encoding
+        lat, lon = destination_point_scalar(HOME[0], HOME[1], rng.uniform(0, 360), rng.uniform(0, 2000))
+        self.vehicle = FakeVehicle(lat, lon, heading=rng.uniform(0, 360), clock=clock, cruise_speed=rng.uniform(1, 3))
+        self.vehicle.set_mode('GUIDED')
+        self.vehicle.set_armed(True)
+        self.vessel_controller = VesselController('SCOUT', vehicle=self.vehicle, clock=clock.time)
+        self.new_waypoint()
+
+    def new_waypoint(self):
+        location = self.vehicle.location.global_frame
+        self.vehicle.target = destination_point_scalar(location.lat, location.lon, self.rng.uniform(0, 360), self.rng.uniform(200, 1000))
+
+    def publish(self):
+        location = self.vehicle.location.global_frame
+        if haversine_scalar(location.lat, location.lon, *self.vehicle.target) < 20:
+            self.new_waypoint()
+        telemetry_data = self.vessel_controller.get_telemetry()
+        telemetry_data['boat'] = 'scout'
+        self.bus.publish(self.topic, encode_payload(telemetry_data, self.encoding))
+
+class SimulatedFollower:
+    # A team vessel following one scout through team.on_scout_position() and follow_scout()
+    def __init__(self, index, scout, clock, rng, bus):
+        location = scout.vehicle.location.global_frame
+        lat, lon = destination_point_scalar(location.lat, location.lon, rng.uniform(0, 360), rng.uniform(50, 300))
+        self.vehicle = FakeVehicle(lat, lon, heading=rng.uniform(0, 360), clock=clock, cruise_speed=4.0)
+        self.vehicle.set_mode('GUIDED')
+        self.vehicle.set_armed(True)
+        self.vessel_controller = VesselController(f'TEAM{index + 1}', vehicle=self.vehicle, clock=clock.time)
+        self.vessel_controller.following = True
+        bus.route(scout.topic, on_scout_position, decode_samples, {'vessel_controller': self.vessel_controller})
+
+class FleetSimulation:
+    """
+    N followers and M scouts on fake vehicles and an in-memory bus, in one process.
+
+    Followers are spread evenly over the scouts. Every step moves all
+    vehicles; every telemetry interval each scout publishes and its
+    followers run the real follow_scout() decision on the decoded sample.
+    """
+
+    def __init__(self, followers, scouts, seed=0, encoding=ENCODING_JSON):
+        self.clock = VirtualClock()
+        self.bus = InMemoryBus()
+        rng = random.Random(seed)
+        self.scouts = [SimulatedScout(i, self.clock, rng, self.bus, encoding) for i in range(scouts)]
+        self.followers = [
+            SimulatedFollower(i, self.scouts[i % scouts], self.clock, rng, self.bus)
+            for i in range(followers)
+        ]
+        self.vehicles = [scout.vehicle for scout in self.scouts] + [follower.vehicle for follower in self.followers]
+
+    def run(self, duration, dt=1.0, telemetry_interval=1.0):
+        # Returns (CPU seconds spent on motion, CPU seconds spent publishing and deciding)
+        motion_time = 0.0
+        decision_time = 0.0
+        next_telemetry = self.clock.now
+        end = self.clock.now + duration
+        while self.clock.now < end:
+            if self.clock.now >= next_telemetry:
+                start = time.process_time()
+                for scout in self.scouts:
+                    scout.publish()
+                for follower in self.followers:
+                    follower.vessel_controller.flush_goto()
+                decision_time += time.process_time() - start
+                next_telemetry += telemetry_interval
+
+            start = time.process_time()
+            for vehicle in self.vehicles:
+                vehicle.step(dt)
+            self.clock.advance(dt)
+            motion_time += time.process_time() - start
+        return motion_time, decision_time
+
+    def goto_commands(self):
+        return sum(len(follower.vehicle.goto_commands) for follower in self.followers)
+
+def run_size(followers, scouts, args):
+    # Build and run one fleet size; memory is measured while building only, so tracing does not skew CPU time
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    simulation = FleetSimulation(followers, scouts, args.seed, args.encoding)
+    memory = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    # follow_scout() reports to stdout; keep it out of the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        motion_time, decision_time = simulation.run(args.duration, args.dt, args.telemetry_interval)
+
+    vessels = followers + scouts
+    decisions = simulation.bus.delivered
+    cpu_time = motion_time + decision_time
+    print(f"{followers:>9} {scouts:>6} {decisions / decision_time:>13.0f} {simulation.goto_commands():>7} "
+          f"{cpu_time / vessels / args.duration * 1e6:>15.1f} {memory / vessels / 1024:>12.1f} "
+          f"{cpu_time / args.duration:>11.3f}")
+
+def positive(value_type):
+    # argparse type: counts and durations of zero or less would divide by zero or never advance
+    def parse(text):
+        value = value_type(text)
+        if value <= 0:
+            raise argparse.ArgumentTypeError(f"must be greater than 0, got {text}")
+        return value
+    parse.__name__ = value_type.__name__  # Shown in argparse's "invalid int value" message
+    return parse
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate many scouts and followers in one process')
+    parser.add_argument('--followers', type=positive(int), nargs='+', default=[10, 100, 1000],
+                        help='Follower counts to run, one fleet per value')
+    parser.add_argument('--scouts', type=positive(int), default=10)
+    parser.add_argument('--duration', type=positive(float), default=60, help='Simulated seconds per fleet')
+    parser.add_argument('--dt', type=positive(float), default=1.0, help='Simulation step in seconds')
+    parser.add_argument('--telemetry-interval', type=positive(float), default=1.0, help='Seconds between scout positions')
+    parser.add_argument('--encoding', choices=['json', 'binary'], default=ENCODING_JSON)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # CPU per vessel is CPU microseconds per simulated second; "load" above 1.0 means slower than real time
+    print(f"{'followers':>9} {'scouts':>6} {'decisions/s':>13} {'gotos':>7} {'cpu us/vessel/s':>15} "
+          f"{'KiB/vessel':>12} {'load':>11}")
+    for followers in args.followers:
+        run_size(followers, args.scouts, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import argparse
+from math import radians, degrees, sin, cos, tan, asin, hypot, atan2, sqrt
+import numpy as np
+
+EARTH_RADIUS = 6371000  # Earth radius in meters
+METERS_PER_DEGREE = radians(1) * EARTH_RADIUS  # Along a meridian
+
+# Every function takes degrees and metres, accepts scalars or NumPy arrays and
+# broadcasts like NumPy, so one call covers a whole fleet or mission. For a
+# single point or pair in a per-fix loop, the *_scalar() versions do the same
+# with math and avoid NumPy's per-call overhead.
+
+def haversine(lat1, lon1, lat2, lon2):
+    # Great-circle distance in metres
+    lat1, lon1, lat2, lon2 = (np.radians(value) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+def haversine_scalar(lat1, lon1, lat2, lon2):
+    # Great-circle distance in metres between two points, with math instead of NumPy (about 5x faster on floats)
+    lat1, lon1, lat2, lon2 = radians(lat1), radians(lon1), radians(lat2), radians(lon2)
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * atan2(sqrt(a), sqrt(1 - a))
+
+def initial_bearing(lat1, lon1, lat2, lon2):
+    # Bearing in degrees (0 = north, clockwise) at the start of the great circle from point 1 to point 2
+    lat1, lon1, lat2, lon2 = (np.radians(value) for value in (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.degrees(np.arctan2(x, y)) % 360
+
+def initial_bearing_scalar(lat1, lon1, lat2, lon2):
+    # initial_bearing() for two points, with math
+    lat1, lon1, lat2, lon2 = radians(lat1), radians(lon1), radians(lat2), radians(lon2)
+    dlon = lon2 - lon1
+    x = sin(dlon) * cos(lat2)
+    y = cos(lat1) * sin(lat2) - sin(lat1) * cos(lat2) * cos(dlon)
+    return degrees(atan2(x, y)) % 360
+
+def destination_point(lat, lon, bearing, distance):
+    # (lat, lon) reached after travelling distance metres along a great circle starting on bearing
+    lat, lon, bearing = (np.radians(value) for value in (lat, lon, bearing))
+    angle = np.asarray(distance, dtype=float) / EARTH_RADIUS
+    lat2 = np.arcsin(np.sin(lat) * np.cos(angle) + np.cos(lat) * np.sin(angle) * np.cos(bearing))
+    lon2 = lon + np.arctan2(np.sin(bearing) * np.sin(angle) * np.cos(lat), np.cos(angle) - np.sin(lat) * np.sin(lat2))
+    return np.degrees(lat2), (np.degrees(lon2) + 540) % 360 - 180
+
+def destination_point_scalar(lat, lon, bearing, distance):
+    # destination_point() for one point, with math; dead-reckoning a fix is bearing = heading, distance = speed * dt
+    lat, lon, bearing = radians(lat), radians(lon), radians(bearing)
+    angle = distance / EARTH_RADIUS
+    lat2 = asin(sin(lat) * cos(angle) + cos(lat) * sin(angle) * cos(bearing))
+    lon2 = lon + atan2(sin(bearing) * sin(angle) * cos(lat), cos(angle) - sin(lat) * sin(lat2))
+    return degrees(lat2), (degrees(lon2) + 540) % 360 - 180
+
+def path_length(lats, lons):
+    # Cumulative distance along a track or mission: element i is the length up to point i (element 0 is 0)
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    cumulative = np.zeros(len(lats))
+    if len(lats) > 1:
+        np.cumsum(haversine(lats[:-1], lons[:-1], lats[1:], lons[1:]), out=cumulative[1:])
+    return cumulative
+
+def fleet_matrices(lats, lons):
+    # N x N distance (metres) and bearing (degrees) from vessel i (row) to vessel j (column)
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lon = np.radians(np.asarray(lons, dtype=float))
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    sin_half_lat, cos_half_lat = np.sin(lat / 2), np.cos(lat / 2)
+    sin_half_lon, cos_half_lon = np.sin(lon / 2), np.cos(lon / 2)
+
+    # Trigonometry runs once per vessel; every pair is built from products with the angle-difference
+    # identities (sin(b - a) = sin b cos a - cos b sin a), which stay accurate for vessels metres apart
+    sin_half_dlat = np.outer(cos_half_lat, sin_half_lat) - np.outer(sin_half_lat, cos_half_lat)
+    sin_half_dlon = np.outer(cos_half_lon, sin_half_lon) - np.outer(sin_half_lon, cos_half_lon)
+    cos_half_dlon = np.outer(cos_half_lon, cos_half_lon) + np.outer(sin_half_lon, sin_half_lon)
+
+    a = sin_half_dlat * sin_half_dlat
+    a += np.outer(cos_lat, cos_lat) * sin_half_dlon * sin_half_dlon
+    distances = np.arctan2(np.sqrt(a), np.sqrt(np.maximum(1 - a, 0.0)))
+    distances *= 2 * EARTH_RADIUS
+
+    x = sin_half_dlon * cos_half_dlon
+    x *= 2 * cos_lat[np.newaxis, :]
+    y = np.outer(sin_lat, cos_lat)
+    y *= 1 - 2 * sin_half_dlon * sin_half_dlon
+    np.subtract(np.outer(cos_lat, sin_lat), y, out=y)
+    bearings = np.degrees(np.arctan2(x, y))
+    bearings[bearings < 0] += 360  # Cheaper than % 360 on large matrices
+    return distances, bearings
+
+class LocalTangentPlane:
+    """
+    East/north (ENU without up) projection around an anchor point.
+
+    Converting a fix costs a handful of multiplies instead of trigonometry,
+    and distances become hypot() in metres. The second-order terms (meridians
+    converging, parallels curving away from the tangent plane) keep distance
+    errors below a millimetre within 2 km of the anchor (see main()).
+    to_local() and to_geodetic() work on scalars and NumPy arrays alike;
+    distance() takes single points (for arrays, np.hypot the to_local()
+    differences as projection_error() does).
+    """
+
+    def __init__(self, lat0, lon0):
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.north_scale = METERS_PER_DEGREE                       # metres per degree of latitude
+        self.east_scale = self.north_scale * cos(radians(lat0))    # metres per degree of longitude at the anchor
+        self.convergence = tan(radians(lat0)) * radians(1)         # relative shrink of east_scale per degree north
+        self.bend = 0.5 * sin(radians(lat0)) * cos(radians(lat0)) * radians(1) ** 2 * EARTH_RADIUS
+
+    def to_local(self, lat, lon):
+        # (east, north) in metres from the anchor
+        dlat = lat - self.lat0
+        dlon = lon - self.lon0
+        return dlon * self.east_scale * (1 - self.convergence * dlat), dlat * self.north_scale + self.bend * dlon * dlon
+
+    def to_geodetic(self, east, north):
+        # Inverse of to_local(); one refinement step is enough at these scales
+        dlat = north / self.north_scale
+        dlon = east / (self.east_scale * (1 - self.convergence * dlat))
+        dlat = (north - self.bend * dlon * dlon) / self.north_scale
+        dlon = east / (self.east_scale * (1 - self.convergence * dlat))
+        return self.lat0 + dlat, self.lon0 + dlon
+
+    def distance(self, lat1, lon1, lat2, lon2):
+        # Metres between two single points; math.hypot keeps the per-fix cost low
+        east1, north1 = self.to_local(lat1, lon1)
+        east2, north2 = self.to_local(lat2, lon2)
+        return hypot(east2 - east1, north2 - north1)
+
+def projection_error(lat0, lon0, radius, samples=100000, seed=0):
+    # Largest absolute and relative distance error of a LocalTangentPlane vs haversine, for point pairs within radius
+    rng = np.random.default_rng(seed)
+    plane = LocalTangentPlane(lat0, lon0)
+    points = []
+    for _ in range(2):
+        lat, lon = destination_point(lat0, lon0, rng.uniform(0, 360, samples), radius * np.sqrt(rng.uniform(0, 1, samples)))
+        points.append((lat, lon))
+    (lat1, lon1), (lat2, lon2) = points
+
+    east1, north1 = plane.to_local(lat1, lon1)
+    east2, north2 = plane.to_local(lat2, lon2)
+    projected = np.hypot(east2 - east1, north2 - north1)
+    exact = haversine(lat1, lon1, lat2, lon2)
+    error = np.abs(projected - exact)
+    return float(error.max()), float((error / np.maximum(exact, 1.0)).max())
+
+def main():
+    parser = argparse.ArgumentParser(description='Check local tangent-plane distances against haversine')
+    parser.add_argument('--anchor', type=float, nargs=2, default=[37.4397, 24.9451], metavar=('LAT', 'LON'),
+                        help='Anchor point (default: Syros port)')
+    parser.add_argument('--radius', type=float, nargs='+', default=[500, 2000, 5000, 20000],
+                        help='Radii in metres around the anchor to test')
+    args = parser.parse_args()
+
+    for radius in args.radius:
+        max_error, max_relative = projection_error(args.anchor[0], args.anchor[1], radius)
+        print(f"Within {radius:>7.0f} m of the anchor: max error {max_error * 1000:.2f} mm ({max_relative * 1e6:.3f} ppm)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import argparse
+import json
+import os
+import random
+import time
+from math import hypot
+import numpy as np
+from dotenv import load_dotenv
+from geodesy import LocalTangentPlane, destination_point, destination_point_scalar
+from topic_router import vessel_position_handler
+
+# Load environment variables from the .env file located one directory above
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+FENCE_KINDS = ('inclusion', 'exclusion')  # Stay inside the race course / stay out of the harbour
+
+class Geofence:
+    """
+    One polygon fence, precompiled for fast point-in-polygon checks.
+
+    Vertices are projected once into the fence set's local tangent plane
+    and kept as edge arrays (start point, direction, inverse slope) with a
+    bounding box. contains() runs the even-odd crossing test for many
+    points against all edges in one NumPy pass, and points outside the
+    bounding box never reach it.
+    """
+
+    def __init__(self, name, kind, vertices, frame):
+        if kind not in FENCE_KINDS:
+            raise ValueError(f"Unknown fence kind for {name}: {kind}")
+        if len(vertices) < 3:
+            raise ValueError(f"Fence {name} needs at least 3 vertices")
+        self.name = name
+        self.kind = kind
+        lats, lons = np.asarray(vertices, dtype=float).T
+        east, north = frame.to_local(lats, lons)
+
+        # Edge i runs from vertex i to vertex i + 1 (the last one closes the polygon)
+        self.x1, self.y1 = east, north
+        self.dx = np.roll(east, -1) - east
+        self.dy = np.roll(north, -1) - north
+        self.y2 = self.y1 + self.dy
+        self.inverse_slope = np.divide(self.dx, self.dy, out=np.zeros(len(east)), where=self.dy != 0)
+        self.length2 = np.maximum(self.dx * self.dx + self.dy * self.dy, 1e-12)
+        self.bbox = (east.min(), north.min(), east.max(), north.max())
+
+    def contains(self, east, north):
+        # Boolean array: which points lie inside the polygon
+        east = np.atleast_1d(np.asarray(east, dtype=float))
+        north = np.atleast_1d(np.asarray(north, dtype=float))
+        min_east, min_north, max_east, max_north = self.bbox
+        inside = np.zeros(len(east), dtype=bool)
+        candidates = np.flatnonzero((east >= min_east) & (east <= max_east) & (north >= min_north) & (north <= max_north))
+        if len(candidates):
+            px = east[candidates, np.newaxis]
+            py = north[candidates, np.newaxis]
+            crossings = ((self.y1 > py) != (self.y2 > py)) & (px < self.x1 + (py - self.y1) * self.inverse_slope)
+            inside[candidates] = np.count_nonzero(crossings, axis=1) % 2 == 1
+        return inside
+
+    def breached(self, inside):
+        return inside if self.kind == 'exclusion' else ~inside
+
+    def clearance(self, east, north):
+        # Distance from one point to the fence boundary (a lower bound from the bounding box when outside it)
+        min_east, min_north, max_east, max_north = self.bbox
+        outside_east = max(min_east - east, 0.0, east - max_east)
+        outside_north = max(min_north - north, 0.0, north - max_north)
+        if outside_east or outside_north:
+            return hypot(outside_east, outside_north)
+        t = np.clip(((east - self.x1) * self.dx + (north - self.y1) * self.dy) / self.length2, 0.0, 1.0)
+        return float(np.hypot(self.x1 + t * self.dx - east, self.y1 + t * self.dy - north).min())
+
+class GeofenceSet:
+    """
+    All fences of an area, sharing one local tangent plane.
+
+    check_mission() tests every waypoint against every fence at once, and
+    check() returns the fences a single position breaches together with its
+    clearance, the distance it can move before that answer can change.
+    """
+
+    def __init__(self, fences):
+        # fences: [(name, kind, [(lat, lon), ...]), ...]
+        if not fences:
+            raise ValueError("No geofences defined")
+        self.frame = LocalTangentPlane(*fences[0][2][0])
+        self.fences = [Geofence(name, kind, vertices, self.frame) for name, kind, vertices in fences]
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Parse a fence file: a line "fence <name> <inclusion|exclusion>"
+        starts a polygon, followed by one latitude,longitude vertex per
+        line. Blank lines and lines starting with # are skipped.
+        """
+        fences = []
+        with open(filename, 'r') as file:
+            for line in file:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                parts = line.split()
+                if parts[0] == 'fence':
+                    if len(parts) != 3:
+                        raise ValueError(f"Bad fence header: {line}")
+                    fences.append((parts[1], parts[2], []))
+                    continue
+                if not fences:
+                    raise ValueError(f"Vertex before any fence header: {line}")
+                lat, lon = map(float, line.split(','))
+                fences[-1][2].append((lat, lon))
+        return cls(fences)
+
+    def check_mission(self, waypoints):
+        # [(waypoint index, fence name), ...] for every waypoint that breaches a fence
+        if not len(waypoints):
+            return []
+        lats = np.array([waypoint[0] for waypoint in waypoints])
+        lons = np.array([waypoint[1] for waypoint in waypoints])
+        east, north = self.frame.to_local(lats, lons)
+        breaches = []
+        for fence in self.fences:
+            for index in np.flatnonzero(fence.breached(fence.contains(east, north))):
+                breaches.append((int(index), fence.name))
+        return sorted(breaches)
+
+    def check(self, east, north):
+        # (names of breached fences, clearance in metres) for one point in the local frame
+        breached = frozenset(fence.name for fence in self.fences if fence.breached(fence.contains(east, north))[0])
+        clearance = min(fence.clearance(east, north) for fence in self.fences)
+        return breached, clearance
+
+class GeofenceMonitor:
+    """
+    Live fence checks for every vessel's telemetry.
+
+    Each vessel keeps the position of its last full check, the fences it
+    breached there and its clearance. A sample that has moved less than
+    the clearance cannot have crossed a boundary, so it costs one
+    projection and one distance (amortized O(1)). Only samples near a
+    boundary run the polygon tests. on_event(event) is called with a
+    geofence_breach or geofence_clear message whenever a vessel's state
+    changes.
+    """
+
+    def __init__(self, geofences, on_event):
+        self.geofences = geofences
+        self.on_event = on_event
+        self.vessels = {}  # vessel -> (east, north, breached fence names, clearance)
+
+        # Counters to see how often the cached answer is enough
+        self.samples = 0
+        self.full_checks = 0
+
+    def update(self, vessel, lat, lon):
+        # Returns the names of the fences the vessel is breaching
+        self.samples += 1
+        east, north = self.geofences.frame.to_local(lat, lon)
+        previous = self.vessels.get(vessel)
+        if previous is not None and hypot(east - previous[0], north - previous[1]) < previous[3]:
+            return previous[2]
+
+        self.full_checks += 1
+        breached, clearance = self.geofences.check(east, north)
+        self.vessels[vessel] = (east, north, breached, clearance)
+        previously_breached = previous[2] if previous is not None else frozenset()
+        for name in sorted(breached - previously_breached):
+            self.on_event(self.event('geofence_breach', vessel, name, lat, lon))
+        for name in sorted(previously_breached - breached):
+            self.on_event(self.event('geofence_clear', vessel, name, lat, lon))
+        return breached
+
+    def event(self, event_type, vessel, name, lat, lon):
+        fence = next(fence for fence in self.geofences.fences if fence.name == name)
+        return {
+            "type": event_type,
+            "vessel": vessel,
+            "fence": name,
+            "kind": fence.kind,
+            "latitude": lat,
+            "longitude": lon,
+            "time_ms": int(time.time() * 1000)
+        }
+
+    def stats(self):
+        return {'vessels': len(self.vessels), 'samples': self.samples, 'full_checks': self.full_checks}
+
+on_vessel_position = vessel_position_handler(
+    lambda userdata, vessel, sample, sample_time: userdata['geofence_monitor'].update(vessel, sample['latitude'], sample['longitude']))
+
+def benchmark(geofences, vessels=20, samples=20000, waypoints=10000, seed=0):
+    # Mission check and live per-sample cost on random tracks around the first fence
+    rng = random.Random(seed)
+    lat0, lon0 = geofences.frame.lat0, geofences.frame.lon0
+    lats, lons = destination_point(lat0, lon0, [rng.uniform(0, 360) for _ in range(waypoints)],
+                                   [3000 * rng.random() for _ in range(waypoints)])
+    start = time.perf_counter()
+    breaches = geofences.check_mission(list(zip(lats, lons)))
+    elapsed = time.perf_counter() - start
+    print(f"Mission of {waypoints} waypoints checked in {elapsed * 1000:.1f} ms ({len(breaches)} breaches)")
+
+    events = []
+    monitor = GeofenceMonitor(geofences, events.append)
+    positions = [(float(lat), float(lon), rng.uniform(0, 360)) for lat, lon in zip(lats[:vessels], lons[:vessels])]
+    start = time.perf_counter()
+    for step in range(samples // vessels):
+        for index, (lat, lon, heading) in enumerate(positions):
+            heading = (heading + rng.uniform(-10, 10)) % 360
+            lat, lon = destination_point_scalar(lat, lon, heading, 3.0)
+            positions[index] = (lat, lon, heading)
+            monitor.update(index, lat, lon)
+    elapsed = time.perf_counter() - start
+    stats = monitor.stats()
+    print(f"Live checks: {elapsed / stats['samples'] * 1e6:.1f} us per sample, "
+          f"{stats['full_checks'] / stats['samples'] * 100:.1f}% needed a polygon test, {len(events)} events")
+
+def main():
+    parser = argparse.ArgumentParser(description='Check live vessel positions against geofences')
+    parser.add_argument('fences', help='Fence file (see GeofenceSet.load)')
+    parser.add_argument('--role', default='scout', help='MQTT credentials to connect with (default: scout)')
+    parser.add_argument('--topics', nargs='+', default=['+/position'],
+                        help='Position topics or filters to check (default: +/position)')
+    parser.add_argument('--benchmark', action='store_true', help='Time mission and live checks instead of connecting')
+    args = parser.parse_args()
+
+    geofences = GeofenceSet.load(args.fences)
+    print(f"Loaded {len(geofences.fences)} fences: "
+          f"{', '.join(f'{fence.name} ({fence.kind})' for fence in geofences.fences)}")
+    if args.benchmark:
+        benchmark(geofences)
+        return
+
+    from mqtt_handler import MQTTHandler
+    from telemetry_codec import decode_samples
+
+    alert_topic = os.getenv('GEOFENCE_ALERT_TOPIC', 'fleet/geofence')
+    mqtt_handler = MQTTHandler(args.role)
+
+    def publish_event(event):
+        print(f"{event['type']}: {event['vessel']} / {event['fence']} ({event['kind']})")
+        mqtt_handler.client.publish(alert_topic, json.dumps(event), qos=1)
+
+    geofence_monitor = GeofenceMonitor(geofences, publish_event)
+    mqtt_handler.client.user_data_set({'geofence_monitor': geofence_monitor})
+    mqtt_handler.route(args.topics, on_vessel_position, decode_samples)
+
+    print(f"Geofence monitor running, events on {alert_topic}")
+    try:
+        while True:
+            time.sleep(5)
+    except KeyboardInterrupt:
+        print("\nShutting down geofence monitor...")
+    finally:
+        print(f"Geofence checks: {geofence_monitor.stats()}")
+        mqtt_handler.disconnect()
+
+if __name__ == "__main__":
+    main()
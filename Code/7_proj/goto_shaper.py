@@ -0,0 +1,95 @@
+import time
+from geodesy import haversine_scalar
+
+class GotoShaper:
+    """
+    Shapes the navigation commands a follower sends to its autopilot.
+
+    A goto within `dedup_radius` meters of the active target is dropped, and
+    a token bucket (`max_rate` commands per second, bursts of up to `burst`)
+    bounds the MAVLink uplink. A goto that finds the bucket empty is held;
+    later ones replace it, so a burst is merged into its newest target. The
+    held target goes out from poll(), which the owner calls once ready_in()
+    seconds have passed (VesselController.flush_goto() on a timer), unless a
+    newer request sends or drops it first. Counters measure every outcome.
+    """
+
+    def __init__(self, send, clock=time.time, dedup_radius=4.0, max_rate=0.1, burst=2):
+        self.send = send  # send(lat, lon) issues the actual command
+        self.clock = clock
+        self.dedup_radius = dedup_radius
+        self.max_rate = max_rate
+        self.burst = burst
+        self.tokens = burst
+        self.refill_time = clock()
+        self.target = None   # Last target sent to the autopilot
+        self.pending = None  # Newest target waiting for a token
+
+        # Counters to measure the uplink load
+        self.issued = 0
+        self.suppressed = 0  # Dropped as duplicates of the active target
+        self.merged = 0      # Superseded by a newer target while waiting for a token
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.refill_time) * self.max_rate)
+        self.refill_time = now
+
+    def request(self, lat, lon):
+        # Ask for a goto; returns True if a command was sent now
+        self.refill()
+        if self.target is not None and haversine_scalar(self.target[0], self.target[1], lat, lon) < self.dedup_radius:
+            self.suppressed += 1
+            if self.pending is not None:
+                # The vessel is already heading to about this point, so the held target is stale
+                self.pending = None
+                self.merged += 1
+            return False
+
+        if self.tokens >= 1:
+            if self.pending is not None:
+                self.merged += 1
+            return self.issue(lat, lon)
+
+        if self.pending is not None:
+            self.merged += 1
+        self.pending = (lat, lon)
+        return False
+
+    def poll(self):
+        # Send the held target once a token is available; returns True if a command was sent
+        self.refill()
+        if self.pending is not None and self.tokens >= 1:
+            return self.issue(*self.pending)
+        return False
+
+    def ready_in(self):
+        # Seconds until poll() can send the held target, or None if nothing is held
+        if self.pending is None:
+            return None
+        self.refill()
+        return max(0.0, (1 - self.tokens) / self.max_rate)
+
+    def issue(self, lat, lon):
+        self.tokens -= 1
+        self.target = (lat, lon)
+        self.pending = None
+        self.issued += 1
+        self.send(lat, lon)
+        return True
+
+    def forget_target(self):
+        # The autopilot dropped its target (e.g. on re-entering GUIDED), so the next goto must not be deduplicated
+        self.target = None
+
+    def reset(self):
+        self.target = None
+        self.pending = None
+
+    def stats(self):
+        return {
+            'issued': self.issued,
+            'suppressed': self.suppressed,
+            'merged': self.merged,
+            'pending': self.pending is not None
+        }
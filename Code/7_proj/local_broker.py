@@ -0,0 +1,397 @@
+import argparse
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+from math import log2
+
+# MQTT control packet types
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+MQTT_V5 = 5
+MAX_QOS = 1  # QoS 2 is not part of the subset
+
+def encode_varint(value):
+    # MQTT "remaining length" variable byte integer
+    encoded = bytearray()
+    while True:
+        byte = value % 128
+        value //= 128
+        encoded.append(byte | 0x80 if value else byte)
+        if not value:
+            return bytes(encoded)
+
+def decode_varint(data, offset):
+    value, multiplier = 0, 1
+    while True:
+        byte = data[offset]
+        offset += 1
+        value += (byte & 0x7F) * multiplier
+        if not byte & 0x80:
+            return value, offset
+        multiplier *= 128
+
+def encode_string(value):
+    if isinstance(value, str):
+        value = value.encode()
+    return len(value).to_bytes(2, 'big') + value
+
+def decode_string(data, offset):
+    length = int.from_bytes(data[offset:offset + 2], 'big')
+    return bytes(data[offset + 2:offset + 2 + length]), offset + 2 + length
+
+def skip_properties(data, offset):
+    # MQTT 5 properties are accepted but ignored
+    length, offset = decode_varint(data, offset)
+    return offset + length
+
+def packet(packet_type, flags, body):
+    return bytes([(packet_type << 4) | flags]) + encode_varint(len(body)) + body
+
+def topic_matches(topic_filter, topic):
+    # MQTT wildcard matching: '+' is one level, '#' the rest; '$' topics never match a leading wildcard
+    filter_levels = topic_filter.split('/')
+    topic_levels = topic.split('/')
+    if topic.startswith('$') and filter_levels[0] in ('+', '#'):
+        return False
+    for i, level in enumerate(filter_levels):
+        if level == '#':
+            return True
+        if i >= len(topic_levels) or (level != '+' and level != topic_levels[i]):
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+class Histogram:
+    """
+    Latency histogram with log-spaced microsecond buckets, four per doubling.
+
+    Bucket i counts values in [2**((i-1)/4), 2**(i/4)) us (bucket 0 is
+    below 1 us), so recording is O(1), memory is fixed and a bucket is at
+    most 19% wide. Percentiles are reported as the upper bucket bound,
+    clamped to the largest value recorded.
+    """
+
+    STEPS = 4  # Buckets per power of two
+
+    def __init__(self, buckets=128):
+        self.counts = [0] * buckets
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        micros = seconds * 1e6
+        bucket = int(log2(micros) * self.STEPS) + 1 if micros >= 1 else 0
+        self.counts[min(bucket, len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, percent):
+        if not self.count:
+            return None
+        target = self.count * percent / 100
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return min(2 ** (i / self.STEPS) / 1e6, self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self):
+        if not self.count:
+            return "no samples"
+        return (f"n={self.count} mean={self.mean() * 1e3:.3f} ms p50<={self.percentile(50) * 1e3:.3f} ms "
+                f"p99<={self.percentile(99) * 1e3:.3f} ms max={self.max * 1e3:.3f} ms")
+
+class TopicStats:
+    def __init__(self):
+        self.messages_in = 0
+        self.messages_out = 0
+        self.bytes_in = 0
+        self.fanout_latency = Histogram()  # Fan-out write time: PUBLISH received -> queued on every subscriber's socket
+
+class Session:
+    def __init__(self, broker, reader, writer):
+        self.broker = broker
+        self.reader = reader
+        self.writer = writer
+        self.client_id = None
+        self.protocol_level = 4
+        self.subscriptions = {}  # topic filter -> granted QoS
+        self.next_packet_id = 0
+
+    def packet_id(self):
+        self.next_packet_id = self.next_packet_id % 65535 + 1
+        return self.next_packet_id
+
+    def send_publish(self, topic, payload, qos, retain=False):
+        body = encode_string(topic)
+        if qos:
+            body += self.packet_id().to_bytes(2, 'big')
+        if self.protocol_level == MQTT_V5:
+            body += b'\x00'  # No properties
+        self.writer.write(packet(PUBLISH, (qos << 1) | int(retain), body + payload))
+
+    async def run(self):
+        try:
+            while True:
+                header = await self.reader.readexactly(1)
+                length, multiplier = 0, 1
+                while True:
+                    byte = (await self.reader.readexactly(1))[0]
+                    length += (byte & 0x7F) * multiplier
+                    multiplier *= 128
+                    if not byte & 0x80:
+                        break
+                body = await self.reader.readexactly(length) if length else b''
+                if not self.handle(header[0] >> 4, header[0] & 0x0F, body):
+                    break
+                await self.writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.broker.remove_session(self)
+            self.writer.close()
+
+    def handle(self, packet_type, flags, body):
+        # Returns False when the connection should be closed
+        if packet_type == CONNECT:
+            return self.handle_connect(body)
+        if packet_type == PUBLISH:
+            return self.handle_publish(flags, body)
+        if packet_type == SUBSCRIBE:
+            self.handle_subscribe(body)
+        elif packet_type == UNSUBSCRIBE:
+            self.handle_unsubscribe(body)
+        elif packet_type == PINGREQ:
+            self.writer.write(packet(PINGRESP, 0, b''))
+        elif packet_type == DISCONNECT:
+            return False
+        # PUBACKs for our QoS 1 deliveries need no action on a local, lossless link
+        return True
+
+    def handle_connect(self, body):
+        _, offset = decode_string(body, 0)  # Protocol name
+        self.protocol_level = body[offset]
+        offset += 4  # Level, flags, keepalive
+        if self.protocol_level == MQTT_V5:
+            offset = skip_properties(body, offset)
+        client_id, offset = decode_string(body, offset)
+        self.client_id = client_id.decode() or f"client-{id(self)}"
+        # Will, username and password are not read: any credentials are accepted
+
+        if self.protocol_level == MQTT_V5:
+            self.writer.write(packet(CONNACK, 0, b'\x00\x00\x00'))
+        else:
+            self.writer.write(packet(CONNACK, 0, b'\x00\x00'))
+        self.broker.sessions.add(self)
+        return True
+
+    def handle_publish(self, flags, body):
+        received_time = time.perf_counter()
+        qos = (flags >> 1) & 0x03
+        retain = bool(flags & 0x01)
+        if qos > MAX_QOS:
+            return False
+        topic, offset = decode_string(body, 0)
+        packet_id = None
+        if qos:
+            packet_id = body[offset:offset + 2]
+            offset += 2
+        if self.protocol_level == MQTT_V5:
+            offset = skip_properties(body, offset)
+        payload = bytes(body[offset:])
+
+        self.broker.publish(topic.decode(), payload, qos, retain, received_time)
+        if qos == 1:
+            self.writer.write(packet(PUBACK, 0, packet_id))
+        return True
+
+    def handle_subscribe(self, body):
+        packet_id = body[:2]
+        offset = 2
+        if self.protocol_level == MQTT_V5:
+            offset = skip_properties(body, offset)
+        granted = []
+        new_filters = []
+        while offset < len(body):
+            topic_filter, offset = decode_string(body, offset)
+            options = body[offset]
+            offset += 1
+            qos = min(options & 0x03, MAX_QOS)
+            self.subscriptions[topic_filter.decode()] = qos
+            new_filters.append(topic_filter.decode())
+            granted.append(qos)
+        self.broker.subscriptions_changed()
+
+        properties = b'\x00' if self.protocol_level == MQTT_V5 else b''
+        self.writer.write(packet(SUBACK, 0, packet_id + properties + bytes(granted)))
+        self.broker.send_retained(self, new_filters)
+
+    def handle_unsubscribe(self, body):
+        packet_id = body[:2]
+        offset = 2
+        if self.protocol_level == MQTT_V5:
+            offset = skip_properties(body, offset)
+        count = 0
+        while offset < len(body):
+            topic_filter, offset = decode_string(body, offset)
+            self.subscriptions.pop(topic_filter.decode(), None)
+            count += 1
+        self.broker.subscriptions_changed()
+
+        if self.protocol_level == MQTT_V5:
+            self.writer.write(packet(UNSUBACK, 0, packet_id + b'\x00' + bytes(count)))
+        else:
+            self.writer.write(packet(UNSUBACK, 0, packet_id))
+
+class LocalBroker:
+    """
+    In-process stand-in MQTT broker for tests and benchmarks.
+
+    Implements the subset of MQTT 3.1.1 and 5 that the vessel scripts use:
+    QoS 0/1, retained messages, '+'/'#' wildcards and any credentials (no
+    TLS). Per-topic message/byte counters and fan-out latency histograms are
+    kept in `stats`.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host = host
+        self.port = port
+        self.server = None
+        self.sessions = set()
+        self.connections = set()   # Tasks serving client connections
+        self.retained = {}         # topic -> (payload, qos)
+        self.route_cache = {}      # topic -> [(session, granted QoS)]
+        self.stats = {}            # topic -> TopicStats
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.on_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        # Close the listener, then end every connection and wait for its session to clean up
+        self.server.close()
+        for task in list(self.connections):
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def on_client(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            await Session(self, reader, writer).run()
+        except asyncio.CancelledError:
+            pass  # Broker stopping; Session.run() has closed the connection
+        finally:
+            self.connections.discard(task)
+
+    def remove_session(self, session):
+        self.sessions.discard(session)
+        self.subscriptions_changed()
+
+    def subscriptions_changed(self):
+        self.route_cache.clear()
+
+    def subscribers(self, topic):
+        # Matching sessions are resolved once per topic and cached until subscriptions change
+        routes = self.route_cache.get(topic)
+        if routes is None:
+            routes = []
+            for session in self.sessions:
+                granted = [qos for topic_filter, qos in session.subscriptions.items() if topic_matches(topic_filter, topic)]
+                if granted:
+                    routes.append((session, max(granted)))
+            self.route_cache[topic] = routes
+        return routes
+
+    def publish(self, topic, payload, qos=0, retain=False, received_time=None):
+        stats = self.stats.get(topic)
+        if stats is None:
+            stats = self.stats[topic] = TopicStats()
+        stats.messages_in += 1
+        stats.bytes_in += len(payload)
+
+        if retain:
+            if payload:
+                self.retained[topic] = (payload, qos)
+            else:
+                self.retained.pop(topic, None)
+
+        for session, granted_qos in self.subscribers(topic):
+            session.send_publish(topic, payload, min(qos, granted_qos))
+            stats.messages_out += 1
+        stats.fanout_latency.record(time.perf_counter() - (received_time or time.perf_counter()))
+
+    def send_retained(self, session, topic_filters):
+        for topic, (payload, qos) in self.retained.items():
+            matching = [session.subscriptions[f] for f in topic_filters if topic_matches(f, topic)]
+            if matching:
+                session.send_publish(topic, payload, min(qos, max(matching)), retain=True)
+
+    def report(self):
+        lines = []
+        for topic, stats in sorted(self.stats.items()):
+            lines.append(f"{topic}: in={stats.messages_in} out={stats.messages_out} bytes={stats.bytes_in} "
+                         f"fanout-write time {stats.fanout_latency.summary()}")
+        return "\n".join(lines)
+
+@contextmanager
+def running_broker(host='127.0.0.1', port=0):
+    # Fixture-style helper: runs a LocalBroker on a background event loop for the duration of a with-block
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="local-broker", daemon=True)
+    thread.start()
+    broker = asyncio.run_coroutine_threadsafe(LocalBroker(host, port).start(), loop).result()
+    try:
+        yield broker
+    finally:
+        asyncio.run_coroutine_threadsafe(broker.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+def configure_environment(broker, roles=('SCOUT', 'TEAM1', 'TEAM2', 'TEAM3')):
+    # Point MQTTHandler at the local broker; topics from .env are kept, credentials default to the role name
+    os.environ['MQTT_BROKER'] = broker.host
+    os.environ['MQTT_PORT'] = str(broker.port)
+    os.environ['MQTT_USE_TLS'] = 'false'
+    for role in roles:
+        os.environ.setdefault(f'{role}_MQTT_USERNAME', role.lower())
+        os.environ.setdefault(f'{role}_MQTT_PASSWORD', role.lower())
+        os.environ.setdefault(f'{role}_POSITION_TOPIC', f'{role.lower()}/position')
+        if role.startswith('TEAM'):
+            os.environ.setdefault(f'{role}_COMMANDS', f'{role.lower()}/commands')
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in MQTT broker (QoS 0/1, retained, wildcards)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1883)
+    args = parser.parse_args()
+
+    async def serve():
+        broker = await LocalBroker(args.host, args.port).start()
+        print(f"Local broker listening on {args.host}:{broker.port}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            print(broker.report())
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("\nLocal broker stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from local_broker import running_broker, configure_environment, Histogram
+from telemetry_codec import decode_samples, TIMESTAMP_FORMAT
+
+def sample(i):
+    # Synthetic scout telemetry, shaped like VesselController.get_telemetry()
+    return {
+        'timestamp': datetime.now().strftime(TIMESTAMP_FORMAT),
+        'latitude': 59.9 + i * 1e-6,
+        'longitude': 10.7 + i * 1e-6,
+        'heading': i % 360,
+        'ground_speed': 2.5
+    }
+
+class LatencyProbe:
+    """
+    End-to-end latency from MQTTHandler.publish() to the subscriber's route handler.
+
+    One publisher over one connection keeps messages in order, so send times
+    are matched to receptions first-in first-out whatever the payload encoding.
+    """
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.send_times = deque()
+        self.latency = Histogram()
+        self.received = 0
+        self.done = None
+
+    def sent(self):
+        self.send_times.append(time.perf_counter())
+
+    def on_samples(self, samples, userdata, msg):
+        self.latency.record(time.perf_counter() - self.send_times.popleft())
+        self.received += 1
+        if self.received == self.expected and self.done is not None:
+            self.done()
+
+def report(label, probe, elapsed, broker):
+    print(f"{label}: {probe.received} messages in {elapsed:.3f} s ({probe.received / elapsed:.0f} msg/s)")
+    print(f"  End-to-end latency: {probe.latency.summary()}")
+    # The broker only times its own fan-out (PUBLISH parsed -> written to subscriber sockets), not delivery
+    print(f"  Broker: {broker.report()}")
+
+def run_threaded(args, broker):
+    # MQTTHandler: one paho network thread per client
+    from mqtt_handler import MQTTHandler
+
+    probe = LatencyProbe(args.messages)
+    finished = threading.Event()
+    probe.done = finished.set
+    with contextlib.redirect_stdout(io.StringIO()):
+        subscriber = MQTTHandler('TEAM1')
+        subscriber.route('SCOUT_POSITION_TOPIC', probe.on_samples, decode_samples, args.qos)
+        publisher = MQTTHandler('SCOUT')
+        publisher.set_topic_encoding(publisher.topic, args.encoding)
+        time.sleep(0.2)  # Let the SUBSCRIBE reach the broker
+
+        start_time = time.perf_counter()
+        for i in range(args.messages):
+            probe.sent()
+            publisher.publish(sample(i), qos=args.qos)
+            if args.rate:
+                time.sleep(1 / args.rate)
+        finished.wait(30)
+        elapsed = time.perf_counter() - start_time
+
+        publisher.disconnect()
+        subscriber.disconnect()
+    report("MQTTHandler", probe, elapsed, broker)
+
+async def run_async(args, broker):
+    # AsyncMQTTHandler: both clients on one event loop
+    from async_mqtt_handler import AsyncMQTTHandler
+
+    probe = LatencyProbe(args.messages)
+    finished = asyncio.Event()
+    probe.done = finished.set
+    with contextlib.redirect_stdout(io.StringIO()):
+        subscriber = AsyncMQTTHandler('TEAM1')
+        publisher = AsyncMQTTHandler('SCOUT')
+        await asyncio.gather(subscriber.start(), publisher.start())
+        subscriber.route('SCOUT_POSITION_TOPIC', probe.on_samples, decode_samples, args.qos)
+        publisher.set_topic_encoding(publisher.topic, args.encoding)
+        await asyncio.sleep(0.2)
+
+        start_time = time.perf_counter()
+        for i in range(args.messages):
+            probe.sent()
+            publisher.publish(sample(i), qos=args.qos)
+            # Yield so the loop can write and read the sockets
+            await asyncio.sleep(1 / args.rate if args.rate else 0)
+        await asyncio.wait_for(finished.wait(), 30)
+        elapsed = time.perf_counter() - start_time
+
+        await publisher.aclose()
+        await subscriber.aclose()
+    report("AsyncMQTTHandler", probe, elapsed, broker)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark scout -> team publish/subscribe against a local broker')
+    parser.add_argument('--messages', type=int, default=5000, help='Telemetry messages to publish')
+    parser.add_argument('--rate', type=float, default=0, help='Messages per second (0 = as fast as possible)')
+    parser.add_argument('--qos', type=int, choices=[0, 1], default=0)
+    parser.add_argument('--encoding', choices=['json', 'binary'], default='json')
+    parser.add_argument('--handler', choices=['threaded', 'async'], default='threaded')
+    args = parser.parse_args()
+
+    # Handler output is suppressed while running so printing does not dominate the timings
+    with running_broker() as broker:
+        configure_environment(broker, roles=('SCOUT', 'TEAM1'))
+        print(f"Local broker on {broker.host}:{broker.port}, {args.messages} messages, "
+              f"QoS {args.qos}, {args.encoding} payloads")
+        if args.handler == 'async':
+            asyncio.run(run_async(args, broker))
+        else:
+            run_threaded(args, broker)
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,16 @@ import os
 import ssl
 from dotenv import load_dotenv
 import json
+from telemetry_codec import encode_payload, encode_batch, decode_samples, ENCODING_JSON
+from telemetry_batch import TelemetryBatch
+from telemetry_journal import TelemetryJournal
+from topic_router import TopicRouter, decode_command
 
 # Load environment variables from the .env file located one directory above
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
 class MQTTHandler:
-    def __init__(self, role):
+    def __init__(self, role, auto_connect=True):
         self.role = role.upper()  # Convert to uppercase for consistency
         
         # Initialize MQTT connection details from role-specific environment variables
@@ -17,9 +21,27 @@ class MQTTHandler:
         self.username = os.getenv(f'{self.role}_MQTT_USERNAME')
         self.password = os.getenv(f'{self.role}_MQTT_PASSWORD')
         self.topic = os.getenv(f'{self.role}_POSITION_TOPIC')
+        self.status_topic = os.getenv(f'{self.role}_STATUS_TOPIC', f'{self.role.lower()}/status')
         self.use_tls = os.getenv('MQTT_USE_TLS', 'false').lower() == 'true'
         self.ca_cert_path = os.getenv('MQTT_CA_CERT_PATH')
         
+        # Payload encoding per topic ('json' or 'binary'), position topic set from the environment
+        self.topic_encodings = {self.topic: os.getenv(f'{self.role}_POSITION_ENCODING', ENCODING_JSON).lower()}
+        
+        # Optional batching of telemetry samples, enabled from the environment or enable_batching()
+        self.batch = None
+        if os.getenv(f'{self.role}_BATCH_MAX_COUNT'):
+            self.enable_batching(
+                max_count=int(os.getenv(f'{self.role}_BATCH_MAX_COUNT')),
+                max_bytes=int(os.getenv(f'{self.role}_BATCH_MAX_BYTES', '4096')),
+                max_age=float(os.getenv(f'{self.role}_BATCH_MAX_AGE', '2.0'))
+            )
+        
+        # Optional on-disk journal of every published telemetry sample
+        self.journal = None
+        if os.getenv(f'{self.role}_JOURNAL_DIR'):
+            self.enable_journal(os.getenv(f'{self.role}_JOURNAL_DIR'))
+        
         # Validate all required configuration is present
         if not all([self.broker, self.port, self.username, self.password, self.topic]):
             raise ValueError(f"Missing required MQTT configuration for role: {self.role}")
@@ -28,6 +50,11 @@ class MQTTHandler:
         self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
         self.client.username_pw_set(self.username, self.password)
         
+        # Routes are resolved once when subscribing; the router is the client's message callback
+        self.router = TopicRouter()
+        self.subscriptions = {}  # topic -> QoS, kept for resubscribe() after a reconnect
+        self.client.on_message = self.router.dispatch
+        
         # Configure TLS if enabled in environment variables
         if self.use_tls:
             # Check for local CA certificate file first (more reliable)
@@ -49,6 +76,11 @@ class MQTTHandler:
         else:
             print("TLS disabled, using non-secure connection")
         
+        # Connect straight away unless the caller drives the network loop itself
+        if auto_connect:
+            self.connect()
+    
+    def connect(self):
         # Attempt to connect to MQTT broker with error handling
         try:
             print(f"Connecting to {self.broker}:{self.port} ...")
@@ -60,78 +92,140 @@ class MQTTHandler:
             print(f"Failed to connect to MQTT broker: {e}")
             raise
     
+    def set_topic_encoding(self, topic, encoding):
+        # Select the payload encoding used when publishing to a topic
+        self.topic_encodings[topic] = encoding.lower()
+    
+    def enable_batching(self, max_count=10, max_bytes=4096, max_age=2.0):
+        # Buffer samples and publish them as one array payload when any limit is reached
+        self.batch = TelemetryBatch(self.publish_batch, max_count, max_bytes, max_age)
+        print(f"Batching enabled: max {max_count} samples, {max_bytes} bytes, {max_age} s")
+    
+    def enable_journal(self, directory, **options):
+        # Append every published telemetry sample to a binary journal (see telemetry_journal.py)
+        self.journal = TelemetryJournal(directory, **options)
+        print(f"Telemetry journal enabled: {directory}")
+    
     # Function to publish a message to the MQTT broker
     def publish(self, payload, qos=0):
         # Add the boat identifier to the payload
         payload['boat'] = self.username
         
-        # Convert the payload to a JSON string
-        json_payload = json.dumps(payload)
+        # Encode the payload as JSON or compact binary depending on the topic
+        encoded_payload = encode_payload(payload, self.topic_encodings.get(self.topic, ENCODING_JSON))
         
-        # Publish the JSON payload to the MQTT broker with specified QoS
-        result = self.client.publish(self.topic, json_payload, qos=qos)
+        # Journal the sample as published (binary payloads are written as they are)
+        if self.journal is not None:
+            self.journal.append(payload, encoded_payload)
+        
+        # In batching mode the sample is only buffered; None tells the caller nothing was sent yet
+        if self.batch is not None:
+            self.batch.add(encoded_payload, qos)
+            return None
+        
+        self.send(encoded_payload, qos)
+        
+        # Return the actual payload that was sent
+        return encoded_payload
+    
+    def publish_status(self, payload, qos=1):
+        # Status reports (command results etc.) go to the role's status topic as JSON
+        payload['boat'] = self.username
+        json_payload = json.dumps(payload)
+        result = self.client.publish(self.status_topic, json_payload, qos=qos)
+        if result.rc != mqtt.MQTT_ERR_SUCCESS:
+            print(f"Failed to publish status to MQTT: {result.rc}")
+        return json_payload
+    
+    def publish_batch(self, encoded_samples, qos=0):
+        # Called by the batch when its count, size or age limit is reached
+        batch_payload = encode_batch(encoded_samples, self.topic_encodings.get(self.topic, ENCODING_JSON))
+        self.send(batch_payload, qos, len(encoded_samples))
+    
+    def flush(self):
+        # Publish any buffered samples immediately
+        if self.batch is not None:
+            self.batch.flush()
+    
+    def send(self, encoded_payload, qos=0, sample_count=1):
+        # Publish the encoded payload to the MQTT broker with specified QoS
+        result = self.client.publish(self.topic, encoded_payload, qos=qos)
         
         if result.rc == mqtt.MQTT_ERR_SUCCESS:
-            print(f"Successfully published to MQTT topic: {self.topic} (QoS={qos})")
+            samples = f", {sample_count} samples" if sample_count > 1 else ""
+            print(f"Successfully published to MQTT topic: {self.topic} (QoS={qos}{samples})")
         else:
             print(f"Failed to publish to MQTT: {result.rc}")
+        return result
+    
+    def resolve_topic(self, topic_name):
+        # Environment variable names (SCOUT_POSITION_TOPIC) or literal topic filters ('+/position')
+        if '/' in topic_name or '+' in topic_name or '#' in topic_name:
+            return topic_name
+        topic = os.getenv(topic_name)
+        if not topic:
+            raise ValueError(f"Missing {topic_name} in environment variables")
+        return topic
+    
+    def topic_qos(self, topic_name, qos, index):
+        # Determine QoS for this topic
+        if qos is None:
+            # Default QoS based on topic type
+            if 'commands' in topic_name.lower():
+                return 1  # QoS 1 for commands (guaranteed delivery)
+            return 0  # QoS 0 for telemetry/positions
+        if isinstance(qos, list):
+            return qos[index]
+        return qos
+    
+    def route(self, topic_names, handler, decoder=None, qos=None):
+        # Subscribe and register handler(decoded_value, userdata, msg) for the topics
+        if isinstance(topic_names, str):
+            topic_names = [topic_names]
         
-        # Return the actual payload that was sent
-        return json_payload
+        for i, topic_name in enumerate(topic_names):
+            topic = self.resolve_topic(topic_name)
+            topic_qos = self.topic_qos(topic_name, qos, i)
+            self.router.add(topic, handler, decoder)
+            self.subscriptions[topic] = topic_qos
+            self.client.subscribe(topic, qos=topic_qos)
+            print(f"Subscribed to topic: {topic} (QoS={topic_qos})")
+    
+    def resubscribe(self):
+        # Restore every subscription after a reconnect; routes are kept as they are
+        for topic, topic_qos in self.subscriptions.items():
+            self.client.subscribe(topic, qos=topic_qos)
     
     def subscribe(self, topic_names, callback=None, qos=None):
         # Handle single topic or list of topics
         if isinstance(topic_names, str):
             topic_names = [topic_names]
-            
+        
         for i, topic_name in enumerate(topic_names):
-            topic = os.getenv(topic_name)
-            if not topic:
-                raise ValueError(f"Missing {topic_name} in environment variables")
-            
-            # Determine QoS for this topic
-            if qos is None:
-                # Default QoS based on topic type
-                if 'commands' in topic_name.lower():
-                    topic_qos = 1  # QoS 1 for commands (guaranteed delivery)
-                else:
-                    topic_qos = 0  # QoS 0 for telemetry/positions
-            elif isinstance(qos, list):
-                topic_qos = qos[i]
-            else:
-                topic_qos = qos
-            
-            self.client.subscribe(topic, qos=topic_qos)
-            
-            # Use custom callback if provided, otherwise use built-in callback
             if callback:
+                # Custom paho-style callback(client, userdata, msg)
+                topic = self.resolve_topic(topic_name)
+                topic_qos = self.topic_qos(topic_name, qos, i)
+                self.subscriptions[topic] = topic_qos
+                self.client.subscribe(topic, qos=topic_qos)
                 self.client.message_callback_add(topic, callback)
+                print(f"Subscribed to topic: {topic} (QoS={topic_qos})")
+            elif 'commands' in topic_name.lower():
+                # Built-in handlers (Project 6 style), chosen once per topic
+                self.route(topic_name, self.on_command, decode_command, self.topic_qos(topic_name, qos, i))
             else:
-                self.client.message_callback_add(topic, self.on_message)
-            
-            print(f"Subscribed to topic: {topic} (QoS={topic_qos})")
+                self.route(topic_name, self.on_position, decode_samples, self.topic_qos(topic_name, qos, i))
     
-    def on_message(self, client, userdata, msg):
-        # Built-in callback for backward compatibility (Project 6 style)
-        try:
-            payload = json.loads(msg.payload.decode())
-            print(f"Received message on topic {msg.topic}:")
-            
-            if 'latitude' in payload and 'longitude' in payload:
-                print(f"  Latitude: {payload['latitude']}, Longitude: {payload['longitude']}")
-            elif msg.topic.lower().endswith('commands'):
-                command = payload.get('command', '').lower()
-                self.handle_command(command)
+    def on_position(self, samples, userdata, msg):
+        print(f"Received message on topic {msg.topic}:")
+        for sample in samples:
+            if 'latitude' in sample and 'longitude' in sample:
+                print(f"  Latitude: {sample['latitude']}, Longitude: {sample['longitude']}")
             else:
-                print(f"  Payload: {payload}")
-                
-        except json.JSONDecodeError:
-            # If JSON parsing fails, treat it as plain text command if from command topic
-            if msg.topic.lower().endswith('commands'):
-                command = msg.payload.decode().strip().lower()
-                self.handle_command(command)
-            else:
-                print(f"Received invalid JSON message on topic {msg.topic}: {msg.payload.decode()}")
+                print(f"  Payload: {sample}")
+    
+    def on_command(self, command, userdata, msg):
+        self.handle_command(command)
     
     def handle_command(self, command):
         if command == "follow":
@@ -148,6 +242,9 @@ class MQTTHandler:
     
     # Function to disconnect the MQTT client
     def disconnect(self):
+        self.flush()  # Send any samples still waiting in the batch
+        if self.journal is not None:
+            self.journal.close()
         self.client.loop_stop()  # Stop the background thread
         self.client.disconnect()
         print("MQTT connection closed.")
\ No newline at end of file
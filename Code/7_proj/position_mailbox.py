@@ -0,0 +1,73 @@
+import threading
+
+class LatestValueMailbox:
+    """
+    Per-source "latest wins" mailbox between MQTT callbacks and slow consumers.
+
+    put() never blocks and overwrites any value from the same source that has
+    not been taken yet, so a consumer that falls behind skips straight to the
+    freshest fix instead of working through a backlog of stale ones.
+    """
+
+    def __init__(self):
+        self.slots = {}
+        self.condition = threading.Condition()
+        self.closed = False
+
+        # Counters: every put, puts that replaced an unprocessed value, and values taken
+        self.received = 0
+        self.coalesced = 0
+        self.processed = 0
+
+    def put(self, source, value):
+        with self.condition:
+            self.received += 1
+            if source in self.slots:
+                self.coalesced += 1
+                # Drop the stale entry so the source moves to the back of the queue
+                del self.slots[source]
+            self.slots[source] = value
+            self.condition.notify()
+
+    def take(self, timeout=None):
+        # Wait for a value; returns (source, value), or None on timeout or close
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.slots or self.closed, timeout):
+                return None
+            if not self.slots:
+                return None
+            # Serve the source that has been waiting longest
+            source = next(iter(self.slots))
+            value = self.slots.pop(source)
+            self.processed += 1
+            return source, value
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def start_consumer(self, handler, name="mailbox-consumer"):
+        # Run handler(source, value) for every value taken, on a dedicated thread
+        def consume():
+            while True:
+                item = self.take()
+                if item is None:
+                    break
+                try:
+                    handler(*item)
+                except Exception as e:
+                    print(f"Error processing value from {item[0]}: {e}")
+
+        thread = threading.Thread(target=consume, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        with self.condition:
+            return {
+                "received": self.received,
+                "coalesced": self.coalesced,
+                "processed": self.processed,
+                "pending": len(self.slots)
+            }
@@ -0,0 +1,116 @@
+import threading
+import time
+from math import radians, cos
+from pymavlink import mavutil
+from geodesy import METERS_PER_DEGREE
+
+# Type masks for SET_POSITION_TARGET_GLOBAL_INT: set bits tell the autopilot to ignore a field.
+# Acceleration, yaw and yaw rate are never used; velocity only when there is a feed-forward to send.
+IGNORE_ACCELERATION = (mavutil.mavlink.POSITION_TARGET_TYPEMASK_AX_IGNORE |
+                       mavutil.mavlink.POSITION_TARGET_TYPEMASK_AY_IGNORE |
+                       mavutil.mavlink.POSITION_TARGET_TYPEMASK_AZ_IGNORE)
+IGNORE_VELOCITY = (mavutil.mavlink.POSITION_TARGET_TYPEMASK_VX_IGNORE |
+                   mavutil.mavlink.POSITION_TARGET_TYPEMASK_VY_IGNORE |
+                   mavutil.mavlink.POSITION_TARGET_TYPEMASK_VZ_IGNORE)
+IGNORE_YAW = mavutil.mavlink.POSITION_TARGET_TYPEMASK_YAW_IGNORE | mavutil.mavlink.POSITION_TARGET_TYPEMASK_YAW_RATE_IGNORE
+POSITION_VELOCITY_MASK = IGNORE_ACCELERATION | IGNORE_YAW
+POSITION_ONLY_MASK = IGNORE_VELOCITY | IGNORE_ACCELERATION | IGNORE_YAW
+
+class PositionTargetStreamer:
+    """
+    Continuous GUIDED steering with SET_POSITION_TARGET_GLOBAL_INT.
+
+    Instead of one simple_goto() per update, a sender thread streams the
+    latest target at a fixed `rate`. Targets carry the scout's velocity as
+    feed-forward, and between updates the position is advanced along it
+    (for at most `max_lead` seconds), so the autopilot tracks a moving point
+    rather than jumping from one stale fix to the next. Every message is
+    counted with its packed size to measure the uplink bandwidth.
+    """
+
+    def __init__(self, vehicle, rate=5.0, clock=time.time, max_lead=10.0):
+        self.vehicle = vehicle
+        self.period = 1.0 / rate
+        self.clock = clock
+        self.max_lead = max_lead
+        self.target = None  # (lat, lon, v_north, v_east, time) or None to send nothing
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.start_time = None
+
+        # Counters to measure the uplink load
+        self.messages_sent = 0
+        self.bytes_sent = 0
+
+    def set_target(self, lat, lon, v_north=None, v_east=None):
+        # Latest target wins; velocities in m/s, None for a position-only target
+        with self.lock:
+            self.target = (lat, lon, v_north, v_east, self.clock())
+
+    def hold(self):
+        # Stop sending targets (e.g. while loitering) until the next set_target()
+        with self.lock:
+            self.target = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.start_time = time.monotonic()
+        self.thread = threading.Thread(target=self.run, name="position-targets", daemon=True)
+        self.thread.start()
+        print(f"Streaming position targets at {1 / self.period:.1f} Hz")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        # Fixed-rate schedule; a late send does not make the following ones bunch up
+        next_send = time.monotonic()
+        while not self.stop_event.wait(max(0.0, next_send - time.monotonic())):
+            try:
+                self.send_target()
+            except Exception as e:
+                print(f"Error sending position target: {e}")
+            next_send = max(next_send + self.period, time.monotonic())
+
+    def send_target(self):
+        # Send the current target once; returns False when there is nothing to send
+        with self.lock:
+            target = self.target
+        if target is None:
+            return False
+
+        lat, lon, v_north, v_east, target_time = target
+        if v_north is None or v_east is None:
+            type_mask = POSITION_ONLY_MASK
+            v_north = v_east = 0.0
+        else:
+            type_mask = POSITION_VELOCITY_MASK
+            lead = min(self.clock() - target_time, self.max_lead)
+            lat += v_north * lead / METERS_PER_DEGREE
+            lon += v_east * lead / (METERS_PER_DEGREE * cos(radians(lat)))
+
+        message = self.vehicle.message_factory.set_position_target_global_int_encode(
+            0, 0, 0,  # time_boot_ms, target system, target component
+            mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT_INT,
+            type_mask,
+            int(lat * 1e7), int(lon * 1e7), 0,
+            v_north, v_east, 0,
+            0, 0, 0,  # acceleration (ignored)
+            0, 0      # yaw, yaw rate (ignored)
+        )
+        self.vehicle.send_mavlink(message)
+        self.messages_sent += 1
+        self.bytes_sent += len(message.get_msgbuf())  # Packed by send_mavlink()
+        return True
+
+    def stats(self):
+        elapsed = time.monotonic() - self.start_time if self.start_time is not None else 0
+        return {
+            'messages': self.messages_sent,
+            'bytes': self.bytes_sent,
+            'bytes_per_second': round(self.bytes_sent / elapsed, 1) if elapsed else None
+        }
@@ -0,0 +1,57 @@
+import time
+from datetime import datetime
+from telemetry_codec import TIMESTAMP_FORMAT
+
+def publisher_time(sample):
+    # Epoch seconds the publisher stamped on a sample: time_ms (binary), else the JSON timestamp (1 s resolution)
+    if 'time_ms' in sample:
+        return sample['time_ms'] / 1000
+    timestamp = sample.get('timestamp')
+    if timestamp:
+        try:
+            return datetime.strptime(timestamp, TIMESTAMP_FORMAT).timestamp()
+        except ValueError:
+            return None
+    return None
+
+class SampleClock:
+    """
+    Maps publisher timestamps onto the local clock, one offset per source.
+
+    The offset is the smallest (receive time - publisher time) seen, which
+    is the clock skew plus the fastest delivery, so latency spikes do not
+    move it. Samples of a batch keep their spacing, yet every time is
+    comparable with time.time() on this side. A sample that arrives more than
+    `jump` seconds later than the offset predicts (the publisher's clock was
+    stepped back) restarts the estimate. Samples without a publisher time get
+    the receive time.
+    """
+
+    def __init__(self, jump=5.0):
+        self.jump = jump
+        self.offsets = {}  # source -> local minus publisher seconds
+        self.skewed = set()  # Sources already reported by check_skew()
+
+    def local_time(self, source, sample, receive_time=None):
+        if receive_time is None:
+            receive_time = time.time()
+        published = publisher_time(sample)
+        if published is None:
+            return receive_time
+
+        observed = receive_time - published
+        offset = self.offsets.get(source)
+        if offset is None or observed < offset or observed - offset > self.jump:
+            offset = self.offsets[source] = observed
+        return published + offset
+
+    def offset(self, source):
+        return self.offsets.get(source)
+
+    def check_skew(self, source, limit):
+        # True the first time a source's offset exceeds limit seconds, so a misset clock is reported once
+        offset = self.offsets.get(source)
+        if offset is None or abs(offset) <= limit or source in self.skewed:
+            return False
+        self.skewed.add(source)
+        return True
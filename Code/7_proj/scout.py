@@ -1,22 +1,50 @@
 import time
+import argparse
 import os
 from dotenv import load_dotenv
 from mqtt_handler import MQTTHandler
 from vessel_controller import VesselController
+from telemetry_stream import TelemetryStream
+from dead_reckoning import DeadReckoningPublisher
 
 # Load environment variables from the .env file located one directory above
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
 def main():
+    # Set up command-line argument parsing
+    parser = argparse.ArgumentParser(description='Scout vessel publishing telemetry')
+    parser.add_argument('--stream', type=float, metavar='MIN_INTERVAL',
+                       help='Publish on DroneKit attribute updates, at most once every MIN_INTERVAL seconds')
+    parser.add_argument('--dr-threshold', type=float, metavar='METERS',
+                       help='Only publish when the real position is more than METERS from the dead-reckoned one')
+    parser.add_argument('--dr-max-silence', type=float, default=30, metavar='SECONDS',
+                       help='Publish at least once every SECONDS when dead-reckoning suppression is on (default: 30)')
+    args = parser.parse_args()
+    
     print("Starting scout vessel...")
+    stream = None
     
     try:
         # Initialize MQTT handler and vessel controller for scout
         mqtt_handler = MQTTHandler('SCOUT')
         vessel_controller = VesselController('SCOUT')
         
+        # Publish every sample, or only those subscribers cannot dead-reckon themselves
+        publish = mqtt_handler.publish
+        dead_reckoning = None
+        if args.dr_threshold is not None:
+            dead_reckoning = DeadReckoningPublisher(mqtt_handler, args.dr_threshold, args.dr_max_silence)
+            publish = dead_reckoning.offer
+        
         print("Scout vessel ready. Publishing telemetry...")
         
+        if args.stream is not None:
+            # Event-driven mode: publish as soon as the autopilot reports new values
+            stream = TelemetryStream(vessel_controller, lambda telemetry_data: publish(telemetry_data, qos=0), args.stream)
+            stream.start()
+            while True:
+                time.sleep(1)
+        
         # Main loop to get telemetry data and publish it every 5 seconds
         # Note: MQTT connection is maintained automatically by the background thread
         while True:
@@ -26,8 +54,9 @@ def main():
                 
                 # Publish telemetry data to the MQTT broker with QoS 0
                 # Scout positions are frequent updates, QoS 0 is appropriate
-                published_payload = mqtt_handler.publish(telemetry_data, qos=0)
-                print(published_payload)
+                published_payload = publish(telemetry_data, qos=0)
+                if published_payload is not None:
+                    print(published_payload)
                 
             except Exception as e:
                 print(f"An error occurred in the main loop: {e}")
@@ -52,6 +81,11 @@ def main():
     finally:
         # Ensure both MQTT and vehicle connections are closed before exiting
         try:
+            if stream is not None:
+                # Remove the DroneKit attribute listeners before the vehicle is closed
+                stream.stop()
+            if dead_reckoning is not None:
+                print(f"Dead-reckoning suppression: {dead_reckoning.stats()}")
             vessel_controller.close_connection()
             mqtt_handler.disconnect()
         except:
@@ -0,0 +1,138 @@
+import threading
+import time
+from math import radians, degrees, sin, cos, atan2, hypot, sqrt
+import numpy as np
+from geodesy import LocalTangentPlane
+
+REANCHOR_DISTANCE = 5000  # Meters from the frame origin before the filter re-anchors on the scout
+
+# Fixes measure position only, or position and velocity when heading and ground speed are present
+H_POSITION = np.eye(2, 4)
+H_FULL = np.eye(4)
+
+class ScoutTracker:
+    """
+    Constant-velocity Kalman filter for one scout, in a local tangent plane.
+
+    The state is [east, north, v_east, v_north] in meters and m/s. Each
+    telemetry sample updates the position, and its heading and ground_speed
+    update the velocity. The filter smooths GPS noise, carries the scout
+    through gaps (including samples suppressed by dead reckoning) and lets
+    the follower aim at an intercept point instead of the last report.
+    """
+
+    def __init__(self, position_noise=3.0, velocity_noise=0.5, acceleration_noise=0.3):
+        self.frame = None
+        self.state = None
+        self.covariance = None
+        self.time = None
+        self.measurement_noise = np.diag([position_noise ** 2] * 2 + [velocity_noise ** 2] * 2)
+        self.acceleration_variance = acceleration_noise ** 2
+        self.lock = threading.Lock()  # Updates arrive on the MQTT thread, predictions are read from others
+
+    def transition(self, dt):
+        # State transition and white-acceleration process noise over dt seconds
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        q = self.acceleration_variance
+        Q = np.zeros((4, 4))
+        Q[0, 0] = Q[1, 1] = q * dt ** 4 / 4
+        Q[0, 2] = Q[2, 0] = Q[1, 3] = Q[3, 1] = q * dt ** 3 / 2
+        Q[2, 2] = Q[3, 3] = q * dt ** 2
+        return F, Q
+
+    def measurement(self, sample):
+        east, north = self.frame.to_local(sample['latitude'], sample['longitude'])
+        heading = sample.get('heading')
+        speed = sample.get('ground_speed')
+        if heading is None or speed is None:
+            return np.array([east, north]), H_POSITION, self.measurement_noise[:2, :2]
+        return (np.array([east, north, speed * sin(radians(heading)), speed * cos(radians(heading))]),
+                H_FULL, self.measurement_noise)
+
+    def update(self, sample, receive_time=None):
+        # receive_time is on the local clock, like predictions (see SampleClock); now if not given
+        if receive_time is None:
+            receive_time = time.time()
+        with self.lock:
+            self.correct(sample, receive_time)
+
+    def correct(self, sample, receive_time):
+        if self.frame is None:
+            self.frame = LocalTangentPlane(sample['latitude'], sample['longitude'])
+        z, H, R = self.measurement(sample)
+
+        if self.state is None:
+            self.state = np.zeros(4)
+            self.state[:len(z)] = z
+            self.covariance = np.diag([R[0, 0], R[1, 1], 100.0, 100.0])
+            self.covariance[:len(z), :len(z)] = R
+            self.time = receive_time
+            return
+
+        # Predict to the sample time (never backwards for late samples), then correct
+        F, Q = self.transition(max(receive_time - self.time, 0))
+        self.time = max(receive_time, self.time)
+        self.state = F @ self.state
+        self.covariance = F @ self.covariance @ F.T + Q
+
+        innovation = z - H @ self.state
+        S = H @ self.covariance @ H.T + R
+        K = self.covariance @ H.T @ np.linalg.inv(S)
+        self.state = self.state + K @ innovation
+        self.covariance = (np.eye(4) - K @ H) @ self.covariance
+
+        if hypot(self.state[0], self.state[1]) > REANCHOR_DISTANCE:
+            self.reanchor()
+
+    def reanchor(self):
+        # Move the frame origin to the estimated position; velocity axes are unchanged at these distances
+        lat, lon = self.frame.to_geodetic(self.state[0], self.state[1])
+        self.frame = LocalTangentPlane(lat, lon)
+        self.state = np.array([0.0, 0.0, self.state[2], self.state[3]])
+
+    def predicted_state(self, at=None):
+        # (frame, east, north, v_east, v_north) extrapolated to `at`, or None before the first fix
+        with self.lock:
+            frame, state, state_time = self.frame, self.state, self.time
+        if state is None:
+            return None
+        dt = (time.time() if at is None else at) - state_time
+        return frame, state[0] + state[2] * dt, state[1] + state[3] * dt, state[2], state[3]
+
+    def predict(self, at=None):
+        # Returns (latitude, longitude, ground_speed) or None before the first fix
+        predicted = self.predicted_state(at)
+        if predicted is None:
+            return None
+        frame, east, north, v_east, v_north = predicted
+        lat, lon = frame.to_geodetic(east, north)
+        return float(lat), float(lon), hypot(v_east, v_north)
+
+    def intercept(self, lat, lon, pursuit_speed, at=None, max_lead=30.0):
+        # Where a vessel at (lat, lon) moving at pursuit_speed meets the scout: (latitude, longitude, ground_speed, heading)
+        predicted = self.predicted_state(at)
+        if predicted is None:
+            return None
+        frame, east, north, v_east, v_north = predicted
+        pursuer_east, pursuer_north = frame.to_local(lat, lon)
+        dx, dy = east - pursuer_east, north - pursuer_north
+
+        # Smallest t > 0 with |d + v t| = pursuit_speed * t; a scout that cannot be caught is led by max_lead
+        a = v_east ** 2 + v_north ** 2 - pursuit_speed ** 2
+        b = 2 * (dx * v_east + dy * v_north)
+        c = dx ** 2 + dy ** 2
+        lead = max_lead
+        if abs(a) < 1e-9:
+            if b < 0:
+                lead = -c / b
+        else:
+            discriminant = b * b - 4 * a * c
+            if discriminant >= 0:
+                roots = [t for t in ((-b - sqrt(discriminant)) / (2 * a), (-b + sqrt(discriminant)) / (2 * a)) if t > 0]
+                if roots:
+                    lead = min(roots)
+        lead = min(lead, max_lead)
+
+        lat, lon = frame.to_geodetic(east + v_east * lead, north + v_north * lead)
+        return float(lat), float(lon), hypot(v_east, v_north), degrees(atan2(v_east, v_north)) % 360
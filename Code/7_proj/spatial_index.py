@@ -0,0 +1,175 @@
+import argparse
+import random
+import time
+from math import floor, hypot
+from geodesy import LocalTangentPlane, haversine_scalar, destination_point
+from topic_router import vessel_position_handler
+
+class SpatialGrid:
+    """
+    Uniform grid of vessels over a local tangent plane.
+
+    Each vessel sits in one `cell_size` square, so an update touches at most
+    two cells and a query only visits the cells around the query point
+    instead of every vessel. Radius and k-nearest queries return
+    (distance, vessel) pairs sorted by distance, in metres. The plane is
+    anchored at the first position seen unless an anchor is given.
+    """
+
+    def __init__(self, cell_size=100.0, anchor=None):
+        self.cell_size = cell_size
+        self.frame = LocalTangentPlane(*anchor) if anchor is not None else None
+        self.cells = {}      # (column, row) -> set of vessels
+        self.positions = {}  # vessel -> (east, north, cell)
+
+        # Occupied cell extent, bounding the ring search of nearest()
+        self.min_cell = None
+        self.max_cell = None
+
+    def __len__(self):
+        return len(self.positions)
+
+    def cell_of(self, east, north):
+        return floor(east / self.cell_size), floor(north / self.cell_size)
+
+    def to_local(self, lat, lon):
+        if self.frame is None:
+            self.frame = LocalTangentPlane(lat, lon)
+        return self.frame.to_local(lat, lon)
+
+    def update(self, vessel, lat, lon):
+        # Insert or move a vessel; O(1)
+        east, north = self.to_local(lat, lon)
+        cell = self.cell_of(east, north)
+        previous = self.positions.get(vessel)
+        if previous is None or previous[2] != cell:
+            if previous is not None:
+                self.discard(vessel, previous[2])
+            self.cells.setdefault(cell, set()).add(vessel)
+            if self.min_cell is None:
+                self.min_cell, self.max_cell = cell, cell
+            else:
+                self.min_cell = (min(self.min_cell[0], cell[0]), min(self.min_cell[1], cell[1]))
+                self.max_cell = (max(self.max_cell[0], cell[0]), max(self.max_cell[1], cell[1]))
+        self.positions[vessel] = (east, north, cell)
+
+    def remove(self, vessel):
+        previous = self.positions.pop(vessel, None)
+        if previous is not None:
+            self.discard(vessel, previous[2])
+
+    def discard(self, vessel, cell):
+        # The extent is not shrunk; it only bounds the search
+        members = self.cells[cell]
+        members.discard(vessel)
+        if not members:
+            del self.cells[cell]
+
+    def ring(self, center, radius):
+        # Cells at Chebyshev distance `radius` from center
+        column, row = center
+        if radius == 0:
+            yield center
+            return
+        for dx in range(-radius, radius + 1):
+            yield column + dx, row - radius
+            yield column + dx, row + radius
+        for dy in range(-radius + 1, radius):
+            yield column - radius, row + dy
+            yield column + radius, row + dy
+
+    def candidates(self, cells, east, north):
+        for cell in cells:
+            for vessel in self.cells.get(cell, ()):
+                other_east, other_north, _ = self.positions[vessel]
+                yield hypot(other_east - east, other_north - north), vessel
+
+    def within(self, lat, lon, radius):
+        # Vessels within radius metres of (lat, lon), nearest first
+        if not self.positions:
+            return []
+        east, north = self.to_local(lat, lon)
+        low = self.cell_of(east - radius, north - radius)
+        high = self.cell_of(east + radius, north + radius)
+        cells = ((column, row) for column in range(low[0], high[0] + 1) for row in range(low[1], high[1] + 1))
+        return sorted(match for match in self.candidates(cells, east, north) if match[0] <= radius)
+
+    def nearest(self, lat, lon, k=1):
+        # The k vessels closest to (lat, lon), nearest first
+        if not self.positions:
+            return []
+        east, north = self.to_local(lat, lon)
+        center = self.cell_of(east, north)
+        # Rings beyond this one hold no vessels
+        last_ring = max(abs(center[0] - self.min_cell[0]), abs(center[0] - self.max_cell[0]),
+                        abs(center[1] - self.min_cell[1]), abs(center[1] - self.max_cell[1]))
+
+        found = []
+        for radius in range(last_ring + 1):
+            if (2 * radius + 1) ** 2 > len(self.cells):
+                # Sparse fleet: the search area has more cells than are occupied, so check those directly
+                found = list(self.candidates(self.cells, east, north))
+                break
+            found.extend(self.candidates(self.ring(center, radius), east, north))
+            # Anything in an unvisited ring is at least radius cells away
+            if len(found) >= k:
+                found.sort()
+                if found[k - 1][0] <= radius * self.cell_size:
+                    break
+        found.sort()
+        return found[:k]
+
+on_vessel_position = vessel_position_handler(
+    lambda userdata, vessel, sample, sample_time: userdata['spatial_grid'].update(vessel, sample['latitude'], sample['longitude']))
+
+def linear_nearest(positions, lat, lon, k=1):
+    # The O(N) scan the index replaces: one haversine per vessel
+    return sorted((haversine_scalar(lat, lon, other_lat, other_lon), vessel)
+                  for vessel, (other_lat, other_lon) in positions.items())[:k]
+
+def benchmark(sizes, radius, cell_size, queries=200, seed=0, center=(37.4397, 24.9451)):
+    # Query cost against fleet size for a fleet spread over a 5 km disc
+    rng = random.Random(seed)
+    print(f"{'vessels':>8} {'update us':>10} {'knn(5) us':>10} {f'r={radius:.0f}m us':>11} {'scan us':>9}")
+    for n in sizes:
+        lats, lons = destination_point(center[0], center[1],
+                                       [rng.uniform(0, 360) for _ in range(n)],
+                                       [5000 * rng.random() ** 0.5 for _ in range(n)])
+        positions = {f"vessel{i}/position": (float(lats[i]), float(lons[i])) for i in range(n)}
+        grid = SpatialGrid(cell_size, anchor=center)
+
+        start = time.perf_counter()
+        for vessel, (lat, lon) in positions.items():
+            grid.update(vessel, lat, lon)
+        update_time = (time.perf_counter() - start) / n
+
+        points = [positions[f"vessel{rng.randrange(n)}/position"] for _ in range(queries)]
+        start = time.perf_counter()
+        for lat, lon in points:
+            grid.nearest(lat, lon, 5)
+        knn_time = (time.perf_counter() - start) / queries
+
+        start = time.perf_counter()
+        for lat, lon in points:
+            grid.within(lat, lon, radius)
+        radius_time = (time.perf_counter() - start) / queries
+
+        # The linear scan is slow, so it gets fewer queries
+        scan_points = points[:max(1, queries * 100 // n)]
+        start = time.perf_counter()
+        for lat, lon in scan_points:
+            linear_nearest(positions, lat, lon, 5)
+        scan_time = (time.perf_counter() - start) / len(scan_points)
+
+        print(f"{n:>8} {update_time * 1e6:>10.1f} {knn_time * 1e6:>10.1f} {radius_time * 1e6:>11.1f} {scan_time * 1e6:>9.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the fleet spatial grid against a linear scan')
+    parser.add_argument('--vessels', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--radius', type=float, default=200, help='Radius query in metres')
+    parser.add_argument('--cell-size', type=float, default=100, help='Grid cell size in metres')
+    args = parser.parse_args()
+    benchmark(args.vessels, args.radius, args.cell_size)
+
+if __name__ == "__main__":
+    main()
@@ -4,87 +4,208 @@ import os
 from dotenv import load_dotenv
 from mqtt_handler import MQTTHandler
 from vessel_controller import VesselController
-import json
+from telemetry_stream import TelemetryStream
+from scout_tracker import ScoutTracker
+from command_executor import CommandExecutor
+from position_mailbox import LatestValueMailbox
+from telemetry_ring import TelemetryHistory
+from sample_clock import SampleClock
+from telemetry_codec import decode_samples
+from topic_router import decode_command
 import struct
 
 # Load environment variables from the .env file located one directory above
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
-def on_message(client, userdata, msg):
+MIN_PURSUIT_SPEED = 2.0  # m/s assumed for the follower when planning an intercept from rest
+PURSUIT_SPEED_WINDOW = 15  # Seconds of the follower's own telemetry averaged for its pursuit speed
+SCOUT_SPEED_WINDOW = 5  # Seconds of scout samples averaged for the speed passed to follow_scout()
+SCOUT_STALE_AFTER = 60  # Seconds without scout samples before the tracker's extrapolation is no longer followed
+
+def on_scout_position(samples, userdata, msg):
+    # Routed handler for the scout position topic; samples are already decoded (JSON or binary, single or batched)
     vessel_controller = userdata['vessel_controller']
+    scout_tracker = userdata.get('scout_tracker')
+    position_mailbox = userdata.get('position_mailbox')
+    telemetry_history = userdata.get('telemetry_history')
+    sample_clock = userdata.get('sample_clock')
+    receive_time = time.time()
     
-    try:
-        payload = json.loads(msg.payload.decode())
-        
-        # Handle scout position updates
-        if 'latitude' in payload and 'longitude' in payload and 'ground_speed' in payload:
-            if vessel_controller.following:
-                vessel_controller.follow_scout(
-                    payload['latitude'],
-                    payload['longitude'], 
-                    payload['ground_speed']
-                )
-        # Handle commands
-        elif msg.topic.lower().endswith('commands'):
-            command = payload.get('command', '').lower()
-            handle_command(command, vessel_controller)
-            
-    except json.JSONDecodeError:
-        # Handle plaintext commands
-        if msg.topic.lower().endswith('commands'):
-            command = msg.payload.decode().strip().lower()
-            handle_command(command, vessel_controller)
+    # Replay batched samples in order
+    for sample in samples:
+        # Publisher time mapped onto the local clock, so batched samples keep their spacing
+        sample_time = sample_clock.local_time(msg.topic, sample, receive_time) if sample_clock is not None else receive_time
+        if telemetry_history is not None:
+            telemetry_history.record(msg.topic, sample, sample_time)
+        if scout_tracker is not None:
+            scout_tracker.update(sample, sample_time)
         else:
-            print(f"Received invalid message on topic {msg.topic}: {msg.payload.decode()}")
+            # Without a tracker the scout's speed is smoothed over its recent samples
+            speed = sample['ground_speed']
+            if telemetry_history is not None:
+                speed = telemetry_history.mean_speed(msg.topic, SCOUT_SPEED_WINDOW, sample_time)
+            follow_position(vessel_controller, position_mailbox, msg.topic,
+                            (sample['latitude'], sample['longitude'], speed, sample.get('heading')))
     
-    except Exception as e:
-        print(f"Error processing message: {e}")
+    # With a tracker the follower aims at the intercept point estimated from every sample
+    if scout_tracker is not None:
+        follow_position(vessel_controller, position_mailbox, msg.topic, intercept_point(vessel_controller, scout_tracker))
+
+def follow_position(vessel_controller, position_mailbox, source, position):
+    if position is None:
+        return
+    if position_mailbox is not None:
+        # Newer positions overwrite ones the follow worker has not reached yet
+        position_mailbox.put(source, position)
+    elif vessel_controller.following:
+        vessel_controller.follow_scout(*position)
+
+def intercept_point(vessel_controller, scout_tracker, at=None):
+    # follow_scout() arguments: the tracked scout (latitude, longitude, speed, heading), then the aim point
+    # where the follower meets it at its current speed; None before the first fix
+    at = time.time() if at is None else at
+    location = vessel_controller.vehicle.location.global_frame
+    # The follower's average speed from its own telemetry history, or its current speed before there is any
+    pursuit_speed = vessel_controller.history.mean_speed(PURSUIT_SPEED_WINDOW, vessel_controller.clock())
+    if pursuit_speed is None:
+        pursuit_speed = vessel_controller.vehicle.groundspeed or 0
+    pursuit_speed = max(pursuit_speed, MIN_PURSUIT_SPEED)
+    aim = scout_tracker.intercept(location.lat, location.lon, pursuit_speed, at)
+    if aim is None:
+        return None
+    scout_lat, scout_lon, _ = scout_tracker.predict(at)
+    aim_lat, aim_lon, scout_speed, scout_heading = aim
+    return scout_lat, scout_lon, scout_speed, scout_heading, aim_lat, aim_lon
+
+def on_command(command, userdata, msg):
+    # Routed handler for the team's command topic; JSON and plaintext commands are already decoded
+    dispatch_command(command, userdata)
+
+def follow_predicted_scout(vessel_controller, scout_tracker, position_mailbox, scout_topic, telemetry_history=None):
+    # The prediction shares the scout's mailbox slot, so only the newest of the two is followed
+    prediction = last_known_scout(telemetry_history, scout_topic)
+    if prediction is None:
+        prediction = intercept_point(vessel_controller, scout_tracker)
+    if prediction is not None and vessel_controller.following:
+        position_mailbox.put(scout_topic, prediction)
+
+def last_known_scout(telemetry_history, scout_topic, now=None):
+    # A scout silent for SCOUT_STALE_AFTER seconds is followed to its last reported position instead of
+    # being extrapolated further; returns None while its samples are recent
+    if telemetry_history is None or scout_topic not in telemetry_history:
+        return None
+    last = telemetry_history[scout_topic].latest()
+    if (time.time() if now is None else now) - last.time <= SCOUT_STALE_AFTER:
+        return None
+    # No heading, so a position target carries no velocity feed-forward past the last fix
+    speed = telemetry_history.mean_speed(scout_topic, SCOUT_SPEED_WINDOW, last.time)
+    return last.latitude, last.longitude, speed, None
+
+def follow_latest_position(vessel_controller, source, position):
+    # Follow worker: always acts on the freshest scout fix in the mailbox
+    if vessel_controller.following:
+        vessel_controller.follow_scout(*position)
 
-def handle_command(command, vessel_controller):
+def dispatch_command(command, userdata):
+    # Hand the command to the executor so the MQTT network thread never blocks
+    command_executor = userdata.get('command_executor')
+    if command_executor is not None:
+        command_executor.submit(command)
+    else:
+        handle_command(command, userdata['vessel_controller'])
+
+def handle_command(command, vessel_controller, timeout=None):
     if command == "follow":
         print("\n" + "*" * 50)
         print("Command to start following is issued")
         print("*" * 50 + "\n")
-        vessel_controller.arm_vehicle()
-        vessel_controller.set_guided_mode()
+        vessel_controller.arm_vehicle(timeout)
+        vessel_controller.set_guided_mode(timeout)
         
     elif command == "stop":
         print("\n" + "*" * 50)
         print("Command to stop following is issued")
         print("*" * 50 + "\n")
-        vessel_controller.stop_following()
+        vessel_controller.stop_following(timeout)
     else:
-        print(f"Unknown command received: {command}")
+        raise ValueError(f"Unknown command received: {command}")
 
 def main():
     # Set up command-line argument parsing
     parser = argparse.ArgumentParser(description='Team vessel with autonomous follow behavior')
     parser.add_argument('team', choices=['team1', 'team2', 'team3'], 
                        help='Team vessel role (team1, team2, or team3)')
+    parser.add_argument('--stream', type=float, metavar='MIN_INTERVAL',
+                       help='Publish on DroneKit attribute updates, at most once every MIN_INTERVAL seconds')
+    parser.add_argument('--command-timeout', type=float, default=30, metavar='SECONDS',
+                       help='Give up on arming or mode changes after SECONDS (default: 30)')
+    parser.add_argument('--position-targets', type=float, metavar='HZ',
+                       help='Steer by streaming SET_POSITION_TARGET_GLOBAL_INT at HZ instead of goto commands')
     
     # Parse command-line arguments
     args = parser.parse_args()
     team = args.team
     
     print(f"Starting {team} vessel...")
+    stream = None
     
     try:
         # Initialize MQTT handler and vessel controller for the specified team
         vessel_controller = VesselController(team)
         mqtt_handler = MQTTHandler(team)
-        
-        # Create a list of topics to subscribe to
-        topics_to_subscribe = ['SCOUT_POSITION_TOPIC', f'{team.upper()}_COMMANDS']
+        if args.position_targets is not None:
+            vessel_controller.start_streaming(args.position_targets)
         
         # Set vessel controller in userdata for callback access
-        mqtt_handler.client.user_data_set({'vessel_controller': vessel_controller})
+        # The scout tracker filters scout fixes and predicts the scout between (possibly suppressed) updates
+        scout_tracker = ScoutTracker()
+        # Recent samples per scout topic; they take over from the tracker once the scout goes silent
+        telemetry_history = TelemetryHistory()
+        
+        # Scout positions are coalesced per source and followed on a dedicated worker thread
+        scout_topic = os.getenv('SCOUT_POSITION_TOPIC')
+        position_mailbox = LatestValueMailbox()
+        position_mailbox.start_consumer(
+            lambda source, position: follow_latest_position(vessel_controller, source, position),
+            name="follow-worker"
+        )
+        
+        # Commands run on their own worker thread and report back on the status topic
+        command_executor = CommandExecutor(
+            lambda command, timeout: handle_command(command, vessel_controller, timeout),
+            mqtt_handler.publish_status,
+            timeout=args.command_timeout
+        )
+        command_executor.start()
+        
+        mqtt_handler.client.user_data_set({
+            'vessel_controller': vessel_controller,
+            'scout_tracker': scout_tracker,
+            'command_executor': command_executor,
+            'position_mailbox': position_mailbox,
+            'telemetry_history': telemetry_history,
+            'sample_clock': SampleClock()  # Maps the scout's timestamps onto this vessel's clock
+        })
         
-        # Subscribe to topics with custom callback
+        # Route each topic to its typed handler and decoder, resolved once here
         # QoS will be automatically set to 1 for commands, 0 for positions
-        mqtt_handler.subscribe(topics_to_subscribe, on_message)
+        mqtt_handler.route('SCOUT_POSITION_TOPIC', on_scout_position, decode_samples)
+        mqtt_handler.route(f'{team.upper()}_COMMANDS', on_command, decode_command)
         
         print("Team vessel ready. Waiting for commands...")
         
+        if args.stream is not None:
+            # Event-driven mode: publish as soon as the autopilot reports new values
+            stream = TelemetryStream(vessel_controller, lambda telemetry_data: mqtt_handler.publish(telemetry_data, qos=0), args.stream)
+            stream.start()
+            while True:
+                time.sleep(5)
+                try:
+                    # Keep following the predicted scout position when no update has arrived
+                    follow_predicted_scout(vessel_controller, scout_tracker, position_mailbox, scout_topic, telemetry_history)
+                except Exception as e:
+                    print(f"An error occurred in the main loop: {e}")
+        
         # Main loop to get telemetry data and publish it every 5 seconds
         # Note: MQTT messages are processed automatically by the background thread
         while True:
@@ -94,7 +215,11 @@ def main():
                 
                 # Publish telemetry data to the MQTT broker with QoS 0
                 published_payload = mqtt_handler.publish(telemetry_data, qos=0)
-                print(published_payload)
+                if published_payload is not None:
+                    print(published_payload)
+                
+                # Keep following the predicted scout position when no update has arrived
+                follow_predicted_scout(vessel_controller, scout_tracker, position_mailbox, scout_topic, telemetry_history)
                 
             except struct.error:
                 print("Encountered a malformed MQTT message. Attempting to reconnect...")
@@ -102,7 +227,7 @@ def main():
                 time.sleep(5)
                 try:
                     mqtt_handler.client.reconnect()
-                    mqtt_handler.subscribe(topics_to_subscribe, on_message)
+                    mqtt_handler.resubscribe()
                 except Exception as e:
                     print(f"Reconnection failed: {e}")
                     time.sleep(5)  # Wait before retrying
@@ -124,6 +249,15 @@ def main():
     finally:
         # Ensure both MQTT and vehicle connections are closed before exiting
         try:
+            if stream is not None:
+                # Remove the DroneKit attribute listeners before the vehicle is closed
+                stream.stop()
+            position_mailbox.close()
+            print(f"Scout positions: {position_mailbox.stats()}")
+            print(f"Goto commands: {vessel_controller.goto_shaper.stats()}")
+            if vessel_controller.position_streamer is not None:
+                print(f"Position targets: {vessel_controller.position_streamer.stats()}")
+            command_executor.stop()
             vessel_controller.close_connection()
             mqtt_handler.disconnect()
         except:
@@ -0,0 +1,71 @@
+import threading
+import time
+
+class TelemetryBatch:
+    """
+    Buffer of encoded telemetry samples with a count/size/age flush policy.
+
+    Samples are added already encoded, so the flush only joins them. The
+    max_age timer runs on its own thread and calls `on_flush(samples, qos)`
+    even if no further sample arrives.
+    """
+
+    def __init__(self, on_flush, max_count=10, max_bytes=4096, max_age=2.0):
+        self.on_flush = on_flush
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.samples = []
+        self.size = 0
+        self.qos = 0
+        self.first_sample_time = None
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def add(self, encoded_sample, qos=0):
+        with self.lock:
+            self.samples.append(encoded_sample)
+            self.size += len(encoded_sample)
+            self.qos = max(self.qos, qos)
+            if self.first_sample_time is None:
+                self.first_sample_time = time.monotonic()
+                self.start_timer()
+
+            full = len(self.samples) >= self.max_count or self.size >= self.max_bytes
+            batch = self.take() if full else None
+
+        if batch:
+            self.on_flush(*batch)
+
+    def start_timer(self):
+        if self.max_age is None:
+            return
+        self.timer = threading.Timer(self.max_age, self.flush)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def take(self):
+        # Detach the buffered samples; called with the lock held
+        batch = (self.samples, self.qos)
+        self.samples = []
+        self.size = 0
+        self.qos = 0
+        self.first_sample_time = None
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        return batch
+
+    def flush(self):
+        with self.lock:
+            batch = self.take() if self.samples else None
+        if batch:
+            self.on_flush(*batch)
+
+    def age(self):
+        if self.first_sample_time is None:
+            return 0
+        return time.monotonic() - self.first_sample_time
+
+    def __len__(self):
+        return len(self.samples)
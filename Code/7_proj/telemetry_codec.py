@@ -0,0 +1,117 @@
+import json
+import os
+import struct
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Load environment variables from the .env file located one directory above
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+# Binary telemetry layout, version 1 (little-endian, 23 bytes):
+#   version      uint8   always 0x81; JSON payloads never start with a byte >= 0x80
+#   boat_id      uint16  numeric boat identifier instead of the MQTT username
+#   time_ms      int64   epoch milliseconds
+#   latitude     int32   degrees * 1e7
+#   longitude    int32   degrees * 1e7
+#   heading      uint16  centidegrees (0-35999)
+#   ground_speed uint16  cm/s
+TELEMETRY_V1 = 0x81
+TELEMETRY_V1_FORMAT = struct.Struct('<BHqiiHH')
+
+# Batches of binary samples: uint8 0x82, uint16 sample count, then the 23-byte records
+TELEMETRY_BATCH_V1 = 0x82
+TELEMETRY_BATCH_HEADER = struct.Struct('<BH')
+
+COORDINATE_SCALE = 1e7
+TIMESTAMP_FORMAT = "%d/%m/%Y - %H:%M:%S"
+TELEMETRY_KEYS = ('heading', 'ground_speed', 'latitude', 'longitude')
+
+ENCODING_JSON = 'json'
+ENCODING_BINARY = 'binary'
+
+def load_boat_ids():
+    # Boat identifiers come from BOAT_IDS="scout=1,team1=2,..." with a default for the known roles
+    boat_ids = {'scout': 1, 'team1': 2, 'team2': 3, 'team3': 4}
+    for entry in os.getenv('BOAT_IDS', '').split(','):
+        if '=' in entry:
+            name, boat_id = entry.split('=', 1)
+            boat_ids[name.strip()] = int(boat_id)
+    return boat_ids
+
+BOAT_IDS = load_boat_ids()
+BOAT_NAMES = {boat_id: name for name, boat_id in BOAT_IDS.items()}
+
+def is_telemetry(payload):
+    return all(key in payload for key in TELEMETRY_KEYS)
+
+def encode_binary(payload):
+    boat = payload.get('boat')
+    if boat not in BOAT_IDS:
+        raise ValueError(f"No boat id configured for boat: {boat}")
+
+    time_ms = payload.get('time_ms')
+    if time_ms is None:
+        time_ms = int(time.time() * 1000)
+
+    heading = payload['heading'] or 0
+    return TELEMETRY_V1_FORMAT.pack(
+        TELEMETRY_V1,
+        BOAT_IDS[boat],
+        time_ms,
+        round(payload['latitude'] * COORDINATE_SCALE),
+        round(payload['longitude'] * COORDINATE_SCALE),
+        round(heading * 100) % 36000,
+        min(round(payload['ground_speed'] * 100), 0xFFFF)
+    )
+
+def decode_binary(data):
+    if len(data) != TELEMETRY_V1_FORMAT.size:
+        raise ValueError(f"Binary telemetry must be {TELEMETRY_V1_FORMAT.size} bytes, got {len(data)}")
+
+    _, boat_id, time_ms, lat, lon, heading, speed = TELEMETRY_V1_FORMAT.unpack(data)
+
+    # Rebuild the same dictionary shape that the JSON messages carry
+    return {
+        "timestamp": datetime.fromtimestamp(time_ms / 1000).strftime(TIMESTAMP_FORMAT),
+        "time_ms": time_ms,
+        "heading": heading / 100,
+        "ground_speed": speed / 100,
+        "latitude": lat / COORDINATE_SCALE,
+        "longitude": lon / COORDINATE_SCALE,
+        "boat": BOAT_NAMES.get(boat_id, boat_id)
+    }
+
+def encode_payload(payload, encoding=ENCODING_JSON):
+    # Only telemetry samples have a binary layout; anything else stays JSON
+    if encoding == ENCODING_BINARY and is_telemetry(payload):
+        return encode_binary(payload)
+    if encoding not in (ENCODING_JSON, ENCODING_BINARY):
+        raise ValueError(f"Unknown payload encoding: {encoding}")
+    return json.dumps(payload)
+
+def decode_payload(data):
+    # Dispatch on the first byte so subscribers accept both encodings transparently
+    if data[:1] == bytes([TELEMETRY_V1]):
+        return decode_binary(data)
+    return json.loads(data.decode())
+
+def encode_batch(encoded_samples, encoding=ENCODING_JSON):
+    # Join samples that were already encoded one by one, so a flush never re-encodes them
+    if encoding == ENCODING_BINARY and all(isinstance(sample, bytes) for sample in encoded_samples):
+        return TELEMETRY_BATCH_HEADER.pack(TELEMETRY_BATCH_V1, len(encoded_samples)) + b''.join(encoded_samples)
+    parts = [sample if isinstance(sample, str) else json.dumps(decode_payload(sample)) for sample in encoded_samples]
+    return '[' + ','.join(parts) + ']'
+
+def decode_samples(data):
+    # Unbatching helper: returns every sample in a message, in the order it was recorded
+    if data[:1] == bytes([TELEMETRY_BATCH_V1]):
+        _, count = TELEMETRY_BATCH_HEADER.unpack_from(data)
+        size = TELEMETRY_V1_FORMAT.size
+        start = TELEMETRY_BATCH_HEADER.size
+        if len(data) != start + count * size:
+            raise ValueError(f"Binary telemetry batch of {count} samples has wrong length {len(data)}")
+        return [decode_binary(data[offset:offset + size]) for offset in range(start, len(data), size)]
+
+    payload = decode_payload(data)
+    return payload if isinstance(payload, list) else [payload]
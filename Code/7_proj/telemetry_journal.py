@@ -0,0 +1,216 @@
+import argparse
+import glob
+import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from telemetry_codec import encode_binary, is_telemetry, TELEMETRY_V1_FORMAT, COORDINATE_SCALE, BOAT_NAMES
+
+# Segment files start with a small header, then fixed-size records in the binary telemetry v1 layout
+JOURNAL_MAGIC = b'TJNL'
+JOURNAL_VERSION = 1
+JOURNAL_HEADER = struct.Struct('<4sHH')  # magic, format version, record size
+SEGMENT_PATTERN = 'telemetry-*.tjnl'
+
+# NumPy view of one record (packed, little-endian, same fields as TELEMETRY_V1_FORMAT)
+RECORD_DTYPE = np.dtype([
+    ('version', 'u1'),
+    ('boat_id', '<u2'),
+    ('time_ms', '<i8'),
+    ('latitude', '<i4'),
+    ('longitude', '<i4'),
+    ('heading', '<u2'),
+    ('ground_speed', '<u2')
+])
+assert RECORD_DTYPE.itemsize == TELEMETRY_V1_FORMAT.size
+
+class TelemetryJournal:
+    """
+    Append-only on-disk journal of published telemetry.
+
+    Each sample is one 23-byte record in the binary telemetry layout (reused
+    as is when the topic already publishes binary). Writes go to a buffered
+    file, so append() costs a few microseconds. A background thread fsyncs
+    every `fsync_interval` seconds, keeping disk latency out of the publish
+    path. Segments rotate once they reach `segment_bytes` or
+    `segment_seconds`.
+    """
+
+    def __init__(self, directory, segment_bytes=16 * 1024 * 1024, segment_seconds=3600,
+                 fsync_interval=1.0, buffer_size=64 * 1024):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.fsync_interval = fsync_interval
+        self.buffer_size = buffer_size
+        os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.file = None
+        self.segment_size = 0
+        self.segment_start = 0
+        self.segment_count = 0
+        self.unsynced = []  # Descriptors of rotated segments still to be fsynced
+        self.dirty = False
+
+        # Counters to measure the journal
+        self.records = 0
+        self.skipped = 0
+        self.fsyncs = 0
+
+        self.stop_event = threading.Event()
+        self.sync_thread = threading.Thread(target=self.sync_loop, name="journal-sync", daemon=True)
+        self.sync_thread.start()
+
+    def open_segment(self):
+        now = time.time()
+        name = f"telemetry-{datetime.fromtimestamp(now).strftime('%Y%m%d-%H%M%S')}-{self.segment_count:04d}.tjnl"
+        self.file = open(os.path.join(self.directory, name), 'wb', buffering=self.buffer_size)
+        self.file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, TELEMETRY_V1_FORMAT.size))
+        self.segment_size = JOURNAL_HEADER.size
+        self.segment_start = now
+        self.segment_count += 1
+
+    def rotate(self):
+        # Close the current segment; the sync thread fsyncs it through a duplicate descriptor
+        self.file.flush()
+        self.unsynced.append(os.dup(self.file.fileno()))
+        self.file.close()
+        self.file = None
+
+    def append(self, payload, encoded_payload=None):
+        # Journal one published sample; returns False for payloads that are not telemetry
+        if isinstance(encoded_payload, bytes) and len(encoded_payload) == TELEMETRY_V1_FORMAT.size:
+            record = encoded_payload
+        elif is_telemetry(payload):
+            try:
+                record = encode_binary(payload)
+            except ValueError:
+                self.skipped += 1  # No boat id configured
+                return False
+        else:
+            return False
+
+        with self.lock:
+            if self.file is not None and (self.segment_size >= self.segment_bytes or
+                                          time.time() - self.segment_start >= self.segment_seconds):
+                self.rotate()
+            if self.file is None:
+                self.open_segment()
+            self.file.write(record)
+            self.segment_size += len(record)
+            self.records += 1
+            self.dirty = True
+        return True
+
+    def sync_loop(self):
+        while not self.stop_event.wait(self.fsync_interval):
+            self.sync()
+
+    def sync(self):
+        # Flush the buffer and fsync outside the lock, so appends never wait for the disk
+        with self.lock:
+            descriptors, self.unsynced = self.unsynced, []
+            if self.file is not None and self.dirty:
+                self.file.flush()
+                descriptors.append(os.dup(self.file.fileno()))
+                self.dirty = False
+        for descriptor in descriptors:
+            try:
+                os.fsync(descriptor)
+                self.fsyncs += 1
+            finally:
+                os.close(descriptor)
+
+    def close(self):
+        self.stop_event.set()
+        self.sync_thread.join()
+        with self.lock:
+            if self.file is not None:
+                self.rotate()
+        self.sync()
+        print(f"Telemetry journal closed: {self.stats()}")
+
+    def stats(self):
+        return {
+            'records': self.records,
+            'skipped': self.skipped,
+            'segments': self.segment_count,
+            'fsyncs': self.fsyncs
+        }
+
+def read_segment(path):
+    # Memory-mapped record array of one segment; a partial record left by a crash is ignored
+    with open(path, 'rb') as file:
+        magic, version, record_size = JOURNAL_HEADER.unpack(file.read(JOURNAL_HEADER.size))
+    if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"Not a version {JOURNAL_VERSION} telemetry journal: {path}")
+    count = (os.path.getsize(path) - JOURNAL_HEADER.size) // record_size
+    if count == 0:
+        return np.recarray(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=JOURNAL_HEADER.size, shape=(count,)).view(np.recarray)
+
+def iter_journal(directory):
+    # Record arrays of every segment, oldest first
+    for path in sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN))):
+        yield path, read_segment(path)
+
+def load_journal(directory):
+    # All records of a journal as one (copied) record array
+    segments = [records for _, records in iter_journal(directory)]
+    if not segments:
+        return np.recarray(0, dtype=RECORD_DTYPE)
+    return np.concatenate(segments).view(np.recarray)
+
+def benchmark(samples=200000):
+    # Cost of append() in the publish path, for binary (reused) and JSON (re-encoded) topics
+    sample = {'heading': 90.0, 'ground_speed': 2.5, 'latitude': 37.4397, 'longitude': 24.9451,
+              'boat': 'scout', 'time_ms': int(time.time() * 1000)}
+    encoded = encode_binary(sample)
+    with tempfile.TemporaryDirectory() as directory:
+        journal = TelemetryJournal(directory, segment_bytes=1024 * 1024)
+        for label, encoded_payload in (('binary topic', encoded), ('JSON topic', None)):
+            start = time.perf_counter()
+            for _ in range(samples):
+                journal.append(sample, encoded_payload)
+            elapsed = time.perf_counter() - start
+            print(f"append() on a {label}: {elapsed / samples * 1e6:.2f} us per sample")
+        journal.close()
+
+        start = time.perf_counter()
+        records = load_journal(directory)
+        elapsed = time.perf_counter() - start
+        print(f"Read {len(records)} records from {journal.segment_count} segments in {elapsed * 1000:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize a telemetry journal directory')
+    parser.add_argument('directory', nargs='?', help='Journal directory ({ROLE}_JOURNAL_DIR)')
+    parser.add_argument('--benchmark', action='store_true', help='Time appends and reads in a temporary journal')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        return
+    if args.directory is None:
+        parser.error('a journal directory is required')
+
+    total = 0
+    for path, records in iter_journal(args.directory):
+        total += len(records)
+        if len(records):
+            start = datetime.fromtimestamp(records.time_ms[0] / 1000).strftime('%H:%M:%S')
+            end = datetime.fromtimestamp(records.time_ms[-1] / 1000).strftime('%H:%M:%S')
+            boats = ', '.join(f"{BOAT_NAMES.get(int(boat_id), int(boat_id))}: {count}"
+                              for boat_id, count in zip(*np.unique(records.boat_id, return_counts=True)))
+            print(f"{os.path.basename(path)}: {len(records)} records, {start} - {end} ({boats})")
+            print(f"  last position: {records.latitude[-1] / COORDINATE_SCALE:.7f}, "
+                  f"{records.longitude[-1] / COORDINATE_SCALE:.7f}")
+        else:
+            print(f"{os.path.basename(path)}: empty")
+    print(f"Total: {total} records")
+
+if __name__ == "__main__":
+    main()
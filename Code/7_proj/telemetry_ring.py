@@ -0,0 +1,134 @@
+import threading
+import time
+import numpy as np
+
+# Column order in the ring's storage
+COLUMNS = ('time', 'latitude', 'longitude', 'heading', 'ground_speed')
+TIME, LATITUDE, LONGITUDE, HEADING, GROUND_SPEED = range(len(COLUMNS))
+
+class TelemetrySample:
+    # One telemetry record; __slots__ keeps it to a few fixed fields instead of a dict
+    __slots__ = COLUMNS
+
+    def __init__(self, time, latitude, longitude, heading, ground_speed):
+        self.time = time
+        self.latitude = latitude
+        self.longitude = longitude
+        self.heading = heading
+        self.ground_speed = ground_speed
+
+    def __repr__(self):
+        return (f"TelemetrySample(time={self.time}, latitude={self.latitude}, longitude={self.longitude}, "
+                f"heading={self.heading}, ground_speed={self.ground_speed})")
+
+class TelemetryWindow:
+    # Column views over the most recent samples, oldest first; valid until the ring wraps over them
+    __slots__ = COLUMNS
+
+    def __init__(self, block):
+        for index, column in enumerate(COLUMNS):
+            setattr(self, column, block[index])
+
+    def __len__(self):
+        return len(self.time)
+
+class TelemetryRing:
+    """
+    Fixed-capacity history of one vessel's telemetry, in preallocated NumPy columns.
+
+    Every sample is written twice, at i and i + capacity, so the last n
+    samples are always one contiguous slice: window() returns views into
+    the storage instead of copies. append() is O(1) and allocates nothing,
+    and memory stays at 2 x 5 x capacity doubles however long the vessel
+    runs. A missing heading is stored as NaN. Times are expected in
+    arrival order; while a sample older than its predecessor is still in the
+    ring, since() falls back to a (copying) mask instead of bisection.
+    """
+
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.data = np.full((len(COLUMNS), 2 * capacity), np.nan)
+        self.next = 0    # Slot the next sample goes to
+        self.count = 0   # Samples held, up to capacity
+        self.appended = 0  # Samples ever appended
+        self.unordered = None  # Value of `appended` after the last sample older than its predecessor
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def append(self, time, latitude, longitude, heading, ground_speed):
+        with self.lock:
+            i = self.next
+            if self.count and time < self.data[TIME, i + self.capacity - 1]:
+                self.unordered = self.appended + 1
+            record = (time, latitude, longitude, np.nan if heading is None else heading, ground_speed)
+            self.data[:, i] = record
+            self.data[:, i + self.capacity] = record
+            self.next = (i + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            self.appended += 1
+
+    def append_sample(self, sample, sample_time=None):
+        # Telemetry dict as published; sample_time on the local clock (see SampleClock), now if not given
+        if sample_time is None:
+            sample_time = time.time()
+        self.append(sample_time, sample['latitude'], sample['longitude'],
+                    sample.get('heading'), sample.get('ground_speed') or 0.0)
+
+    def window(self, n=None):
+        # The last n samples (all of them by default) as zero-copy column views
+        with self.lock:
+            n = self.count if n is None else min(n, self.count)
+            end = self.next + self.capacity
+            return TelemetryWindow(self.data[:, end - n:end])
+
+    def since(self, start_time):
+        # Samples newer than start_time: a binary search while times are ordered, else a mask (a copy)
+        with self.lock:
+            n = self.count
+            end = self.next + self.capacity
+            block = self.data[:, end - n:end]
+            # The out-of-order sample and its predecessor are both still held
+            ordered = self.unordered is None or self.appended - self.unordered >= n - 1
+        if ordered:
+            return TelemetryWindow(block[:, int(np.searchsorted(block[TIME], start_time, side='right')):])
+        return TelemetryWindow(block[:, block[TIME] > start_time])
+
+    def latest(self):
+        with self.lock:
+            if not self.count:
+                return None
+            values = self.data[:, self.next + self.capacity - 1].tolist()
+        if values[HEADING] != values[HEADING]:  # NaN
+            values[HEADING] = None
+        return TelemetrySample(*values)
+
+    def mean_speed(self, seconds, now=None):
+        # Average ground speed over the last `seconds`, or None without samples in that span
+        window = self.since((time.time() if now is None else now) - seconds)
+        return float(window.ground_speed.mean()) if len(window) else None
+
+class TelemetryHistory:
+    # One TelemetryRing per vessel, created on its first sample
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.rings = {}
+
+    def __getitem__(self, vessel):
+        return self.rings[vessel]
+
+    def __contains__(self, vessel):
+        return vessel in self.rings
+
+    def record(self, vessel, sample, sample_time=None):
+        ring = self.rings.get(vessel)
+        if ring is None:
+            ring = self.rings.setdefault(vessel, TelemetryRing(self.capacity))
+        ring.append_sample(sample, sample_time)
+        return ring
+
+    def mean_speed(self, vessel, seconds, now=None):
+        # Average ground speed of a vessel over the last `seconds`, or None if it has no samples then
+        ring = self.rings.get(vessel)
+        return ring.mean_speed(seconds, now) if ring is not None else None
@@ -0,0 +1,79 @@
+import threading
+import time
+
+# DroneKit attributes that trigger a new telemetry sample
+STREAM_ATTRIBUTES = ('location.global_frame', 'heading', 'groundspeed')
+
+class TelemetryStream:
+    """
+    Event-driven telemetry from DroneKit attribute listeners.
+
+    Every location/heading/groundspeed update marks the telemetry as changed.
+    A sample is handed to `on_sample(telemetry_data)` at most once per
+    `min_interval` seconds; updates arriving in between are coalesced and the
+    latest state is sent when the interval expires, so nothing is lost but
+    the link is never flooded at the MAVLink stream rate.
+    """
+
+    def __init__(self, vessel_controller, on_sample, min_interval=0.2):
+        self.vessel_controller = vessel_controller
+        self.on_sample = on_sample
+        self.min_interval = min_interval
+        self.last_sample_time = 0
+        self.pending_timer = None
+        self.running = False
+        self.lock = threading.Lock()
+
+        # Counters to see how much coalescing is going on
+        self.updates_received = 0
+        self.samples_sent = 0
+
+    def start(self):
+        # Register the listeners; DroneKit calls them from its MAVLink thread
+        self.running = True
+        for attribute in STREAM_ATTRIBUTES:
+            self.vessel_controller.vehicle.add_attribute_listener(attribute, self.on_attribute)
+        print(f"Telemetry streaming started (min interval {self.min_interval} s)")
+
+    def stop(self):
+        self.running = False
+        for attribute in STREAM_ATTRIBUTES:
+            self.vessel_controller.vehicle.remove_attribute_listener(attribute, self.on_attribute)
+        with self.lock:
+            if self.pending_timer is not None:
+                self.pending_timer.cancel()
+                self.pending_timer = None
+        print(f"Telemetry streaming stopped: {self.updates_received} updates, {self.samples_sent} samples sent")
+
+    def on_attribute(self, vehicle, attr_name, value):
+        with self.lock:
+            self.updates_received += 1
+            if not self.running or self.pending_timer is not None:
+                # A sample is already scheduled and will read the latest state
+                return
+
+            wait = self.last_sample_time + self.min_interval - time.monotonic()
+            if wait > 0:
+                # Too soon: coalesce with whatever arrives before the interval ends
+                self.pending_timer = threading.Timer(wait, self.emit_pending)
+                self.pending_timer.daemon = True
+                self.pending_timer.start()
+                return
+            self.last_sample_time = time.monotonic()
+
+        self.emit()
+
+    def emit_pending(self):
+        with self.lock:
+            self.pending_timer = None
+            if not self.running:
+                return
+            self.last_sample_time = time.monotonic()
+        self.emit()
+
+    def emit(self):
+        try:
+            self.on_sample(self.vessel_controller.get_telemetry())
+            self.samples_sent += 1
+        except Exception as e:
+            print(f"Error publishing streamed telemetry: {e}")
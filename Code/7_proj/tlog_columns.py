@@ -0,0 +1,184 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from pymavlink import mavutil
+
+DEFAULT_TLOG = os.path.join(os.path.dirname(__file__), '..', '5_proj', 'mav.tlog')
+
+# MAVLink field types -> NumPy dtypes ('char' arrays become fixed-width byte strings)
+FIELD_DTYPES = {
+    'int8_t': 'i1', 'uint8_t': 'u1', 'int16_t': '<i2', 'uint16_t': '<u2',
+    'int32_t': '<i4', 'uint32_t': '<u4', 'int64_t': '<i8', 'uint64_t': '<u8',
+    'float': '<f4', 'double': '<f8', 'char': 'S1'
+}
+
+# Columns added to every message type
+TIME_COLUMN = 'time'              # float64 seconds since epoch from the tlog timestamp
+SOURCE_COLUMNS = ('src_system', 'src_component')
+
+# .npy header with room for any row count, so it can be rewritten in place once the count is known
+NPY_HEADER_SIZE = 128
+CHUNK_ROWS = 4096
+
+def npy_header(dtype, shape):
+    header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': shape})
+    prefix = b'\x93NUMPY\x01\x00'
+    body_size = NPY_HEADER_SIZE - len(prefix) - 2
+    body = header.encode('latin1').ljust(body_size - 1) + b'\n'
+    return prefix + len(body).to_bytes(2, 'little') + body
+
+class ColumnWriter:
+    """
+    Append-only .npy column.
+
+    Rows are buffered in a small preallocated chunk and written with tofile(),
+    so memory stays bounded however long the log is. The header is rewritten
+    with the final row count on close(), leaving a normal .npy file that
+    np.load(..., mmap_mode='r') maps without copying.
+    """
+
+    def __init__(self, path, dtype, width=0):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.row_shape = (width,) if width and self.dtype.kind != 'S' else ()
+        self.chunk = np.zeros((CHUNK_ROWS,) + self.row_shape, dtype=self.dtype)
+        self.filled = 0
+        self.rows = 0
+        self.file = open(path, 'wb')
+        self.file.write(npy_header(self.dtype, (0,) + self.row_shape))
+
+    def append(self, value):
+        if isinstance(value, str):
+            value = value.encode('utf-8', 'replace')
+        self.chunk[self.filled] = value
+        self.filled += 1
+        if self.filled == CHUNK_ROWS:
+            self.flush()
+
+    def flush(self):
+        self.chunk[:self.filled].tofile(self.file)
+        self.rows += self.filled
+        self.filled = 0
+
+    def close(self):
+        self.flush()
+        self.file.seek(0)
+        self.file.write(npy_header(self.dtype, (self.rows,) + self.row_shape))
+        self.file.close()
+
+def field_columns(msg):
+    # (field name, dtype, array width) for each field of a MAVLink message class
+    lengths = dict(zip(msg.ordered_fieldnames, msg.array_lengths))
+    columns = []
+    for name, field_type in zip(msg.fieldnames, msg.fieldtypes):
+        width = lengths.get(name, 0)
+        dtype = FIELD_DTYPES.get(field_type, '<f8')
+        if field_type == 'char':
+            dtype = f'S{max(width, 1)}'
+        columns.append((name, dtype, width))
+    return columns
+
+def convert(tlog_path, out_dir=None, types=None):
+    # Stream a tlog once, writing <out_dir>/<TYPE>/<field>.npy columns; returns rows per type
+    out_dir = out_dir or tlog_path + '.columns'
+    os.makedirs(out_dir, exist_ok=True)
+    writers = {}
+    log = mavutil.mavlink_connection(tlog_path)
+
+    try:
+        while True:
+            msg = log.recv_match(type=types)
+            if msg is None:
+                break
+            msg_type = msg.get_type()
+            if msg_type == 'BAD_DATA':
+                continue
+
+            columns = writers.get(msg_type)
+            if columns is None:
+                type_dir = os.path.join(out_dir, msg_type)
+                os.makedirs(type_dir, exist_ok=True)
+                columns = [(TIME_COLUMN, ColumnWriter(os.path.join(type_dir, TIME_COLUMN + '.npy'), '<f8'))]
+                columns += [(name, ColumnWriter(os.path.join(type_dir, name + '.npy'), 'u1')) for name in SOURCE_COLUMNS]
+                columns += [
+                    (name, ColumnWriter(os.path.join(type_dir, name + '.npy'), dtype, width))
+                    for name, dtype, width in field_columns(msg)
+                ]
+                writers[msg_type] = columns
+
+            columns[0][1].append(getattr(msg, '_timestamp', 0.0))
+            columns[1][1].append(msg.get_srcSystem())
+            columns[2][1].append(msg.get_srcComponent())
+            for name, writer in columns[3:]:
+                writer.append(getattr(msg, name))
+    finally:
+        log.close()
+        for columns in writers.values():
+            for _, writer in columns:
+                writer.close()
+
+    return {msg_type: columns[0][1].rows for msg_type, columns in writers.items()}
+
+def convert_many(tlog_paths, workers=None, types=None):
+    # Convert several logs in parallel, one process per log
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(convert, tlog_paths, [None] * len(tlog_paths), [types] * len(tlog_paths))
+        return dict(zip(tlog_paths, results))
+
+def load_columns(columns_dir, msg_type):
+    # Memory-mapped NumPy views of every column of a message type; nothing is re-parsed
+    type_dir = os.path.join(columns_dir, msg_type)
+    return {
+        os.path.splitext(name)[0]: np.load(os.path.join(type_dir, name), mmap_mode='r')
+        for name in sorted(os.listdir(type_dir)) if name.endswith('.npy')
+    }
+
+def mode_changes(columns_dir, system=None):
+    # (time, mode name) for every flight mode change reported by the autopilot heartbeats, in time order.
+    # Only the autopilot component of one system counts (the busiest one unless given), so GCS, companion
+    # or second-vehicle heartbeats do not interleave, and rows are sorted because tlog clocks can step back.
+    heartbeat = load_columns(columns_dir, 'HEARTBEAT')
+    autopilot = ((heartbeat['type'] != mavutil.mavlink.MAV_TYPE_GCS) &
+                 (heartbeat['autopilot'] != mavutil.mavlink.MAV_AUTOPILOT_INVALID) &
+                 (heartbeat['src_component'] == mavutil.mavlink.MAV_COMP_ID_AUTOPILOT1))
+    if system is None:
+        systems, counts = np.unique(heartbeat['src_system'][autopilot], return_counts=True)
+        if not len(systems):
+            return []
+        system = systems[np.argmax(counts)]
+    rows = np.flatnonzero(autopilot & (heartbeat['src_system'] == system))
+    rows = rows[np.argsort(heartbeat[TIME_COLUMN][rows], kind='stable')]
+    times = heartbeat[TIME_COLUMN][rows]
+    modes = heartbeat['custom_mode'][rows]
+    vehicle_types = heartbeat['type'][rows]
+    changed = np.flatnonzero(np.diff(modes.astype(np.int64), prepend=-1))
+    mappings = {}
+    changes = []
+    for i in changed:
+        vehicle_type, mode = int(vehicle_types[i]), int(modes[i])
+        mapping = mappings.setdefault(vehicle_type, mavutil.mode_mapping_bynumber(vehicle_type) or {})
+        changes.append((float(times[i]), mapping.get(mode, f"Mode({mode})")))
+    return changes
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert tlogs into per-message-type NumPy columns')
+    parser.add_argument('tlogs', nargs='*', default=[DEFAULT_TLOG], help='tlog files (default: 5_proj/mav.tlog)')
+    parser.add_argument('--types', nargs='+', default=None, help='Only convert these message types')
+    parser.add_argument('--workers', type=int, default=None, help='Processes to use (default: one per CPU)')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    results = convert_many(args.tlogs, args.workers, args.types)
+    print(f"Converted {len(results)} log(s) in {time.perf_counter() - start_time:.2f} s")
+    for tlog_path, rows in results.items():
+        print(f"{tlog_path}.columns: {sum(rows.values())} rows, {len(rows)} message types")
+        if 'GLOBAL_POSITION_INT' in rows:
+            position = load_columns(tlog_path + '.columns', 'GLOBAL_POSITION_INT')
+            print(f"  GLOBAL_POSITION_INT lat range: {position['lat'].min() / 1e7:.6f} .. {position['lat'].max() / 1e7:.6f}")
+        if 'HEARTBEAT' in rows:
+            print(f"  Mode changes: {mode_changes(tlog_path + '.columns')}")
+
+if __name__ == "__main__":
+    main()
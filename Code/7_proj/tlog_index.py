@@ -0,0 +1,289 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+import numpy as np
+from pymavlink import mavutil
+
+DEFAULT_TLOG = os.path.join(os.path.dirname(__file__), '..', '5_proj', 'mav.tlog')
+
+MAVLINK_V1_MAGIC = 0xFE
+MAVLINK_V2_MAGIC = 0xFD
+MAVLINK_IFLAG_SIGNED = 0x01
+
+# Sidecar index file (<log>.idx):
+#   header  magic b'TLIX', version uint16, timestamped uint16, log bytes indexed uint64, log head uint64
+#   records msgid uint32, timestamp_us uint64, frame offset uint64 (one per MAVLink frame, in log order)
+INDEX_MAGIC = b'TLIX'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('<4sHHQQ')
+INDEX_RECORD = struct.Struct('<IQQ')
+TLOG_TIMESTAMP = struct.Struct('>Q')
+
+# NumPy view of the sidecar records, so the file is memory-mapped instead of unpacked
+INDEX_DTYPE = np.dtype([('msgid', '<u4'), ('timestamp', '<u8'), ('offset', '<u8')])
+assert INDEX_DTYPE.itemsize == INDEX_RECORD.size
+NO_ROWS = np.zeros(0, dtype=np.int64)
+NO_TIMESTAMPS = np.zeros(0, dtype=np.uint64)
+
+MESSAGE_IDS = {cls.msgname: msgid for msgid, cls in mavutil.mavlink.mavlink_map.items()}
+
+def frame_length(buf, offset):
+    # Length of the MAVLink frame starting at offset, or None if no frame (or only part of its header) is there
+    magic = buf[offset]
+    if magic == MAVLINK_V2_MAGIC:
+        if offset + 10 > len(buf):
+            return None
+        signed = buf[offset + 2] & MAVLINK_IFLAG_SIGNED
+        return 12 + buf[offset + 1] + (13 if signed else 0)
+    if magic == MAVLINK_V1_MAGIC:
+        if offset + 6 > len(buf):
+            return None
+        return 8 + buf[offset + 1]
+    return None
+
+def frame_msgid(buf, offset):
+    if buf[offset] == MAVLINK_V2_MAGIC:
+        return buf[offset + 7] | (buf[offset + 8] << 8) | (buf[offset + 9] << 16)
+    return buf[offset + 5]
+
+def log_head(buf):
+    # First bytes of the log, used to detect a log that was replaced rather than appended to
+    return int.from_bytes(bytes(buf[:8]).ljust(8, b'\0'), 'little')
+
+class TlogIndex:
+    """
+    One-pass index of a tlog (or a raw MAVLink stream such as mav.tlog.raw).
+
+    Only MAVLink framing is parsed, never the payloads. Frame offsets and
+    timestamps go to a sidecar `.idx` file in log order, which is
+    memory-mapped rather than read into Python objects. Per message id the
+    index keeps the record numbers sorted by timestamp, because tlog
+    timestamps are not monotonic (mav.tlog steps back about 9 minutes when
+    the ground station clock was set). The sidecar is loaded once; when the
+    log grows, update() indexes only the new bytes, appends them to the file
+    and merges them into the affected types. Raw streams have no per-frame
+    timestamps, so time queries need a tlog.
+    """
+
+    def __init__(self, log_path, timestamped=None, index_path=None):
+        self.log_path = log_path
+        self.index_path = index_path or log_path + '.idx'
+        self.timestamped = not log_path.endswith('.raw') if timestamped is None else timestamped
+        self.loaded = False  # Whether the state below mirrors the sidecar
+        self.reset(0)
+
+    def reset(self, head):
+        self.indexed_size = 0
+        self.head = head
+        self.records = np.zeros(0, dtype=INDEX_DTYPE)  # Memory-mapped sidecar records, in log order
+        self.rows = {}        # msgid -> record numbers sorted by timestamp
+        self.timestamps = {}  # msgid -> timestamps in microseconds, sorted, matching rows
+
+    def load(self):
+        # Map an existing sidecar; returns False if there is none or it does not match the log
+        if not os.path.exists(self.index_path):
+            return False
+        with open(self.index_path, 'rb') as file:
+            header = file.read(INDEX_HEADER.size)
+        if len(header) != INDEX_HEADER.size:
+            return False
+        magic, version, timestamped, indexed_size, head = INDEX_HEADER.unpack(header)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION or bool(timestamped) != self.timestamped:
+            return False
+
+        self.reset(head)
+        self.map_records((os.path.getsize(self.index_path) - INDEX_HEADER.size) // INDEX_RECORD.size)
+        # Records past indexed_size were written by an update that never committed its header
+        count = int(np.searchsorted(self.records['offset'], indexed_size))
+        self.map_records(count)
+        self.sort_rows(0)
+        self.indexed_size = indexed_size
+        self.loaded = True
+        return True
+
+    def map_records(self, count):
+        if count == 0:
+            self.records = np.zeros(0, dtype=INDEX_DTYPE)
+        else:
+            self.records = np.memmap(self.index_path, dtype=INDEX_DTYPE, mode='r',
+                                     offset=INDEX_HEADER.size, shape=(count,))
+
+    def sort_rows(self, start):
+        # Merge the records from start on into the per-type rows, keeping each type in time order
+        new = self.records[start:]
+        if not len(new):
+            return
+        msgids = new['msgid']
+        order = np.argsort(msgids, kind='stable')
+        for group in np.split(order, np.flatnonzero(np.diff(msgids[order])) + 1):
+            msgid = int(msgids[group[0]])
+            rows = np.concatenate((self.rows.get(msgid, NO_ROWS), group + start))
+            timestamps = np.concatenate((self.timestamps.get(msgid, NO_TIMESTAMPS),
+                                         new['timestamp'][group]))
+            if (timestamps[1:] < timestamps[:-1]).any():
+                # Stable, so frames with equal timestamps stay in log order
+                by_time = np.argsort(timestamps, kind='stable')
+                rows, timestamps = rows[by_time], timestamps[by_time]
+            self.rows[msgid] = rows
+            self.timestamps[msgid] = timestamps
+
+    def update(self):
+        # Bring the index up to date with the log, rebuilding it only if the log was replaced
+        log_size = os.path.getsize(self.log_path)
+        if log_size == 0:
+            return 0
+        with open(self.log_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            head = log_head(buf)
+            if not self.loaded:
+                self.load()
+            stale = not self.loaded or log_size < self.indexed_size or self.head != head
+            if stale:
+                # Drop the old mapping before the sidecar is truncated
+                self.reset(head)
+                self.loaded = False
+            elif self.indexed_size == log_size:
+                return 0
+
+            records, end = self.scan(buf, self.indexed_size)
+
+        start = len(self.records)
+        with open(self.index_path, 'r+b' if self.loaded else 'wb') as file:
+            if not self.loaded:
+                file.write(bytes(INDEX_HEADER.size))  # Placeholder until the scan is committed
+            # Overwrite any uncommitted records from an earlier crash
+            file.seek(INDEX_HEADER.size + start * INDEX_RECORD.size)
+            file.truncate()
+            file.write(b''.join(INDEX_RECORD.pack(*record) for record in records))
+            # Write the header last, so a crash leaves at worst unreferenced trailing records
+            self.indexed_size = end
+            file.seek(0)
+            file.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.timestamped, self.indexed_size, self.head))
+        self.map_records(start + len(records))
+        self.sort_rows(start)
+        self.loaded = True
+        return len(records)
+
+    def scan(self, buf, start):
+        # Walk the frames from start; returns the new (msgid, timestamp, offset) records and where parsing stopped
+        records = []
+        prefix = TLOG_TIMESTAMP.size if self.timestamped else 0
+        size = len(buf)
+        position = start
+        while position + prefix < size:
+            frame = position + prefix
+            if buf[frame] not in (MAVLINK_V1_MAGIC, MAVLINK_V2_MAGIC):
+                # Lost sync: skip ahead to the next byte that could start a frame
+                position = self.resync(buf, position + 1)
+                continue
+            length = frame_length(buf, frame)
+            if length is None or frame + length > size:
+                break  # Incomplete frame at the end of a growing log
+            next_frame = frame + length + prefix
+            if next_frame < size and buf[next_frame] not in (MAVLINK_V1_MAGIC, MAVLINK_V2_MAGIC):
+                # The following record does not line up, so this was not a real frame
+                position = self.resync(buf, position + 1)
+                continue
+
+            timestamp = TLOG_TIMESTAMP.unpack_from(buf, position)[0] if prefix else 0
+            records.append((frame_msgid(buf, frame), timestamp, frame))
+            position = frame + length
+        return records, position
+
+    def resync(self, buf, position):
+        prefix = TLOG_TIMESTAMP.size if self.timestamped else 0
+        candidates = [buf.find(bytes([magic]), position + prefix) for magic in (MAVLINK_V1_MAGIC, MAVLINK_V2_MAGIC)]
+        candidates = [candidate for candidate in candidates if candidate >= 0]
+        return min(candidates) - prefix if candidates else len(buf)
+
+    def message_types(self):
+        names = {msgid: name for name, msgid in MESSAGE_IDS.items()}
+        return {names.get(msgid, msgid): len(rows) for msgid, rows in self.rows.items()}
+
+class TlogReader:
+    """
+    Random access to a tlog through its index.
+
+    The log is memory-mapped and only the frames selected by type and time
+    range are decoded, e.g. all GLOBAL_POSITION_INT between t0 and t1.
+    """
+
+    def __init__(self, log_path, timestamped=None):
+        self.index = TlogIndex(log_path, timestamped)
+        self.index.update()
+        self.file = open(log_path, 'rb')
+        self.buf = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mav = mavutil.mavlink.MAVLink(None)
+
+    def refresh(self):
+        # Index and map whatever was appended to the log since the reader was opened
+        self.index.update()
+        self.buf.close()
+        self.buf = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def select(self, msg_type, t0=None, t1=None):
+        # Offsets and timestamps of msg_type frames with t0 <= time <= t1 (seconds since epoch), in time order
+        msgid = MESSAGE_IDS[msg_type] if isinstance(msg_type, str) else msg_type
+        rows = self.index.rows.get(msgid, NO_ROWS)
+        timestamps = self.index.timestamps.get(msgid, NO_TIMESTAMPS)
+        if t0 is not None or t1 is not None:
+            if not self.index.timestamped:
+                raise ValueError("Time range queries need a timestamped tlog, not a raw MAVLink stream")
+            # Each type is sorted by time, so the range is found by bisection
+            first = 0 if t0 is None else int(np.searchsorted(timestamps, int(t0 * 1e6), side='left'))
+            last = len(timestamps) if t1 is None else int(np.searchsorted(timestamps, int(t1 * 1e6), side='right'))
+            rows, timestamps = rows[first:last], timestamps[first:last]
+        return self.index.records['offset'][rows], timestamps
+
+    def messages(self, msg_type, t0=None, t1=None):
+        # Decode only the selected frames; msg._timestamp is set like pymavlink does for tlogs
+        offsets, timestamps = self.select(msg_type, t0, t1)
+        for offset, timestamp in zip(offsets.tolist(), timestamps.tolist()):
+            length = frame_length(self.buf, offset)
+            msg = self.mav.decode(bytearray(self.buf[offset:offset + length]))
+            if self.index.timestamped:
+                msg._timestamp = timestamp / 1e6
+            yield msg
+
+    def count(self, msg_type, t0=None, t1=None):
+        return len(self.select(msg_type, t0, t1)[0])
+
+    def time_range(self):
+        starts = [int(timestamps[0]) for timestamps in self.index.timestamps.values() if len(timestamps)]
+        ends = [int(timestamps[-1]) for timestamps in self.index.timestamps.values() if len(timestamps)]
+        if not starts:
+            return None
+        return min(starts) / 1e6, max(ends) / 1e6
+
+    def close(self):
+        self.buf.close()
+        self.file.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Index a tlog and query it by message type and time')
+    parser.add_argument('tlog', nargs='?', default=DEFAULT_TLOG, help='Path to the tlog (default: 5_proj/mav.tlog)')
+    parser.add_argument('--type', default='GLOBAL_POSITION_INT', help='Message type to query')
+    parser.add_argument('--start', type=float, default=None, help='Seconds from the start of the log')
+    parser.add_argument('--end', type=float, default=None, help='Seconds from the start of the log')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    reader = TlogReader(args.tlog)
+    print(f"Index ready in {time.perf_counter() - start_time:.3f} s: {reader.index.message_types()}")
+
+    t0 = t1 = None
+    if reader.index.timestamped and (args.start is not None or args.end is not None):
+        log_start, _ = reader.time_range()
+        t0 = None if args.start is None else log_start + args.start
+        t1 = None if args.end is None else log_start + args.end
+
+    start_time = time.perf_counter()
+    messages = list(reader.messages(args.type, t0, t1))
+    print(f"{len(messages)} {args.type} messages decoded in {time.perf_counter() - start_time:.3f} s")
+    if messages:
+        print(f"First: {messages[0]}")
+    reader.close()
+
+if __name__ == "__main__":
+    main()
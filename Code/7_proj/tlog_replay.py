@@ -0,0 +1,475 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import paho.mqtt.client as mqtt
+from pymavlink import mavutil
+
+DEFAULT_TLOG = os.path.join(os.path.dirname(__file__), '..', '5_proj', 'mav.tlog')
+REPLAY_TYPES = ['HEARTBEAT', 'GLOBAL_POSITION_INT', 'VFR_HUD', 'COMMAND_ACK', 'STATUSTEXT']
+
+class ReplayLocation:
+    # Minimal stand-in for dronekit's LocationGlobal / LocationGlobalRelative
+    __slots__ = ('lat', 'lon', 'alt')
+
+    def __init__(self, lat=None, lon=None, alt=None):
+        self.lat = lat
+        self.lon = lon
+        self.alt = alt
+
+    def __str__(self):
+        return f"Location:lat={self.lat},lon={self.lon},alt={self.alt}"
+
+class ReplayLocations:
+    def __init__(self):
+        self.global_frame = ReplayLocation()
+        self.global_relative_frame = ReplayLocation()
+
+class ReplayMode:
+    # Same shape as dronekit's VehicleMode: only .name is read by VesselController
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+class TlogVehicle:
+    """
+    Vehicle-like object fed from a recorded MAVLink session.
+
+    Exposes the attributes VesselController and MissionManager read
+    (location.global_frame, heading, groundspeed, mode, armed) plus DroneKit's
+    attribute/message listener API. simple_goto(), send_mavlink() and
+    mode/armed writes are recorded instead of being sent, so follow logic can be replayed offline.
+    """
+
+    def __init__(self):
+        self.location = ReplayLocations()
+        self.heading = None
+        self.groundspeed = 0.0
+        self._mode = ReplayMode('INITIALISING')
+        self._armed = False
+        self.attribute_listeners = {}
+        self.message_listeners = {}
+
+        # Commands issued by the code under test
+        self.goto_commands = []
+        self.mode_requests = []
+        self.arm_requests = []
+        self.sent_messages = []
+        self.message_factory = mavutil.mavlink.MAVLink(None)  # Encodes messages like DroneKit's, without a link
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @mode.setter
+    def mode(self, value):
+        self.mode_requests.append(value.name)
+        self.set_mode(value.name)
+
+    @property
+    def armed(self):
+        return self._armed
+
+    @armed.setter
+    def armed(self, value):
+        self.arm_requests.append(value)
+        self.set_armed(value)
+
+    def set_mode(self, name):
+        if name != self._mode.name:
+            self._mode = ReplayMode(name)
+            self.notify_attribute_listeners('mode', self._mode)
+
+    def set_armed(self, armed):
+        if armed != self._armed:
+            self._armed = armed
+            self.notify_attribute_listeners('armed', armed)
+
+    def simple_goto(self, location, airspeed=None, groundspeed=None):
+        self.goto_commands.append((location.lat, location.lon))
+
+    def send_mavlink(self, message):
+        # Pack as DroneKit would (so get_msgbuf() works) and record instead of sending
+        message.pack(self.message_factory)
+        self.sent_messages.append(message)
+
+    def add_attribute_listener(self, attr_name, observer):
+        self.attribute_listeners.setdefault(attr_name, []).append(observer)
+
+    def remove_attribute_listener(self, attr_name, observer):
+        listeners = self.attribute_listeners.get(attr_name, [])
+        if observer in listeners:
+            listeners.remove(observer)
+
+    def notify_attribute_listeners(self, attr_name, value):
+        for observer in list(self.attribute_listeners.get(attr_name, ())):
+            observer(self, attr_name, value)
+        for observer in list(self.attribute_listeners.get('*', ())):
+            observer(self, attr_name, value)
+
+    def add_message_listener(self, name, fn):
+        self.message_listeners.setdefault(name, []).append(fn)
+
+    def remove_message_listener(self, name, fn):
+        listeners = self.message_listeners.get(name, [])
+        if fn in listeners:
+            listeners.remove(fn)
+
+    def notify_message_listeners(self, name, msg):
+        for fn in list(self.message_listeners.get(name, ())):
+            fn(self, name, msg)
+        for fn in list(self.message_listeners.get('*', ())):
+            fn(self, name, msg)
+
+    def close(self):
+        pass
+
+class PublishResult:
+    # What paho's publish() returns, as far as MQTTHandler reads it
+    __slots__ = ('rc',)
+
+    def __init__(self, rc=mqtt.MQTT_ERR_SUCCESS):
+        self.rc = rc
+
+class StubMQTTClient:
+    # Stand-in for paho's client: MQTTHandler publishes are recorded instead of sent
+    def __init__(self):
+        self.published = []  # (topic, payload, qos)
+        self.userdata = None
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        # Stored as the bytes paho would send (str payloads are UTF-8 encoded)
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        self.published.append((topic, payload, qos))
+        return PublishResult()
+
+    def subscribe(self, topic, qos=0):
+        return mqtt.MQTT_ERR_SUCCESS, None
+
+    def user_data_set(self, userdata):
+        self.userdata = userdata
+
+    def loop_stop(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+class TlogReplay:
+    """
+    Streams a tlog into a TlogVehicle.
+
+    speed=1 replays in real time, speed=N warps time N times faster and
+    speed=0 replays as fast as possible. Only messages from the autopilot
+    (not the GCS) update the vehicle state.
+    """
+
+    def __init__(self, path=DEFAULT_TLOG, speed=1.0, vehicle=None):
+        self.path = path
+        self.speed = speed
+        self.vehicle = vehicle or TlogVehicle()
+        self.messages = 0
+        self.position_updates = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+
+    def apply(self, msg):
+        # Update the vehicle from one MAVLink message, mirroring DroneKit's handlers
+        msg_type = msg.get_type()
+        vehicle = self.vehicle
+
+        if msg_type == 'GLOBAL_POSITION_INT':
+            vehicle.location.global_frame.lat = msg.lat / 1e7
+            vehicle.location.global_frame.lon = msg.lon / 1e7
+            vehicle.location.global_frame.alt = msg.alt / 1000
+            vehicle.location.global_relative_frame.lat = msg.lat / 1e7
+            vehicle.location.global_relative_frame.lon = msg.lon / 1e7
+            vehicle.location.global_relative_frame.alt = msg.relative_alt / 1000
+            self.position_updates += 1
+            vehicle.notify_attribute_listeners('location.global_frame', vehicle.location.global_frame)
+            vehicle.notify_attribute_listeners('location.global_relative_frame', vehicle.location.global_relative_frame)
+        elif msg_type == 'VFR_HUD':
+            vehicle.heading = msg.heading
+            vehicle.groundspeed = msg.groundspeed
+            vehicle.notify_attribute_listeners('heading', vehicle.heading)
+            vehicle.notify_attribute_listeners('groundspeed', vehicle.groundspeed)
+        elif msg_type == 'HEARTBEAT':
+            if msg.type == mavutil.mavlink.MAV_TYPE_GCS:
+                return
+            vehicle.set_mode(mavutil.mode_string_v10(msg))
+            vehicle.set_armed(bool(msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED))
+
+        vehicle.notify_message_listeners(msg_type, msg)
+
+    def replay(self, types=REPLAY_TYPES):
+        # Generator: applies each message and yields it, pacing by the recorded timestamps
+        log = mavutil.mavlink_connection(self.path)
+        start_wall = time.monotonic()
+        try:
+            while True:
+                msg = log.recv_match(type=types)
+                if msg is None:
+                    break
+                if msg.get_type() == 'BAD_DATA':
+                    continue
+
+                timestamp = getattr(msg, '_timestamp', None)
+                if timestamp is not None:
+                    if self.first_timestamp is None:
+                        self.first_timestamp = timestamp
+                    self.last_timestamp = timestamp
+                    if self.speed:
+                        delay = start_wall + (timestamp - self.first_timestamp) / self.speed - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+
+                self.messages += 1
+                self.apply(msg)
+                yield msg
+        finally:
+            log.close()
+
+    def run(self):
+        # Replay the whole log; listeners on the vehicle see every update
+        for _ in self.replay():
+            pass
+        return self
+
+    def duration(self):
+        if self.first_timestamp is None:
+            return 0
+        return self.last_timestamp - self.first_timestamp
+
+class FollowRun:
+    """
+    A scout's telemetry sent through the whole follow path.
+
+    Each fix goes through get_telemetry() and MQTTHandler.publish() (on a
+    StubMQTTClient), is decoded as a team vessel would decode it and drives
+    follow_scout() of a FakeVehicle follower on a virtual clock. results()
+    returns the counts and distances to compare.
+    """
+
+    def __init__(self, encoding='json'):
+        from mqtt_handler import MQTTHandler
+        from fake_vehicle import VirtualClock
+
+        # Offline defaults for the scout's MQTT settings; nothing connects
+        for name, value in (('MQTT_BROKER', 'localhost'), ('MQTT_PORT', '1883'), ('SCOUT_MQTT_USERNAME', 'scout'),
+                            ('SCOUT_MQTT_PASSWORD', 'scout'), ('SCOUT_POSITION_TOPIC', 'scout/position')):
+            os.environ.setdefault(name, value)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.mqtt_handler = MQTTHandler('SCOUT', auto_connect=False)
+        self.mqtt_handler.client = StubMQTTClient()
+        self.mqtt_handler.set_topic_encoding(self.mqtt_handler.topic, encoding)
+
+        self.clock = VirtualClock()
+        self.follower = None
+        self.follower_controller = None
+        self.distances = []
+        self.mismatches = 0
+
+    def start_follower(self, lat, lon):
+        # The follower starts 30 m south of the scout's first fix
+        from vessel_controller import VesselController
+        from fake_vehicle import FakeVehicle
+        from geodesy import destination_point_scalar
+
+        self.follower = FakeVehicle(*destination_point_scalar(lat, lon, 180, 30), clock=self.clock, cruise_speed=4.0)
+        self.follower.set_mode('GUIDED')
+        self.follower.set_armed(True)
+        self.follower_controller = VesselController('TEAM1', vehicle=self.follower, clock=self.clock.time)
+        self.follower_controller.following = True
+
+    def follow(self, scout_controller):
+        # Publish the scout's current telemetry and have the follower act on what went out on the wire
+        from telemetry_codec import decode_samples
+        from geodesy import haversine_scalar
+
+        telemetry_data = scout_controller.get_telemetry()
+        if self.follower is None:
+            self.start_follower(telemetry_data['latitude'], telemetry_data['longitude'])
+        self.mqtt_handler.publish(telemetry_data, qos=0)
+        for sample in decode_samples(self.mqtt_handler.client.published[-1][1]):
+            if (abs(sample['latitude'] - telemetry_data['latitude']) > 1e-7 or
+                    abs(sample['longitude'] - telemetry_data['longitude']) > 1e-7):
+                self.mismatches += 1
+            self.follower_controller.follow_scout(sample['latitude'], sample['longitude'],
+                                                  sample['ground_speed'], sample.get('heading'))
+        self.follower_controller.flush_goto()
+
+        follower_location = self.follower.location.global_frame
+        self.distances.append(haversine_scalar(telemetry_data['latitude'], telemetry_data['longitude'],
+                                               follower_location.lat, follower_location.lon))
+
+    def results(self):
+        shaper = self.follower_controller.goto_shaper if self.follower_controller else None
+        return {
+            'published': len(self.mqtt_handler.client.published),
+            'decode_mismatches': self.mismatches,
+            'gotos': len(self.follower.goto_commands) if self.follower else 0,
+            'gotos_deduplicated': shaper.suppressed if shaper else 0,
+            'gotos_merged': shaper.merged if shaper else 0,
+            'mode_changes': len(self.follower.mode_requests) if self.follower else 0,
+            'mean_distance': round(sum(self.distances) / len(self.distances), 1) if self.distances else None,
+            'max_distance': round(max(self.distances), 1) if self.distances else None,
+            'positions': len(self.distances)
+        }
+
+# Follow replay results; --check fails when a change to the telemetry, MQTT or follow path moves them.
+# The recorded vessel in mav.tlog barely moves (about 4 cm), so it covers the approach and one LOITER;
+# the course segment covers steering, goto deduplication and rate limiting, and resuming after a hold.
+# Update them deliberately when the behaviour is meant to change.
+EXPECTED_FOLLOW = {
+    'tlog': {
+        'json': {'published': 2162, 'gotos': 1, 'gotos_deduplicated': 17, 'mode_changes': 1, 'mean_distance': 2.3},
+        'binary': {'published': 2162, 'gotos': 1, 'gotos_deduplicated': 17, 'mode_changes': 1, 'mean_distance': 2.3}
+    },
+    'course': {
+        'json': {'published': 1033, 'gotos': 79, 'gotos_deduplicated': 73, 'gotos_merged': 444, 'mode_changes': 52,
+                 'mean_distance': 12.3},
+        'binary': {'published': 1033, 'gotos': 79, 'gotos_deduplicated': 73, 'gotos_merged': 445, 'mode_changes': 54,
+                   'mean_distance': 12.3}
+    }
+}
+
+# Scout course for the moving segment: (bearing in degrees, leg length in meters, speed in m/s, seconds held at the end).
+# On the slow leg the follower keeps catching up to within 5 m, so it alternates between LOITER and GUIDED.
+FOLLOW_COURSE = ((0, 400, 2.5, 0), (90, 300, 2.5, 0), (200, 350, 2.5, 60), (270, 60, 0.3, 0), (320, 250, 2.5, 0))
+
+def replay_follow(path=DEFAULT_TLOG, encoding='json', dt=0.2):
+    # Replay the recorded vessel as the scout; the follower moves on the log's time
+    from vessel_controller import VesselController
+
+    replay = TlogReplay(path, speed=0)
+    scout_controller = VesselController('SCOUT', vehicle=replay.vehicle)
+    run = FollowRun(encoding)
+    first_timestamp = None
+
+    # publish() and follow_scout() report every step on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        for msg in replay.replay():
+            if msg.get_type() != 'GLOBAL_POSITION_INT' or not replay.vehicle.location.global_frame.lat:
+                continue
+            if first_timestamp is None:
+                first_timestamp = msg._timestamp
+            # Move the follower up to the time of this fix (tlog clocks can step back; time only moves forward here)
+            if run.follower is not None:
+                while run.clock.now + dt <= msg._timestamp - first_timestamp:
+                    run.follower.step(dt)
+                    run.clock.advance(dt)
+            run.follow(scout_controller)
+
+    return run.results()
+
+def follow_course(encoding='json', dt=0.2, telemetry_interval=1.0, course=FOLLOW_COURSE):
+    # A FakeVehicle scout sails `course` from the Project 8 home position, holding where a leg says so
+    from vessel_controller import VesselController
+    from fake_vehicle import FakeVehicle, HOME, advance
+    from geodesy import destination_point_scalar, haversine_scalar
+
+    run = FollowRun(encoding)
+    scout = FakeVehicle(HOME[0], HOME[1], clock=run.clock)
+    scout.set_mode('GUIDED')
+    scout.set_armed(True)
+    scout_controller = VesselController('SCOUT', vehicle=scout)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for bearing, length, speed, hold in course:
+            location = scout.location.global_frame
+            scout.cruise_speed = speed
+            scout.target = destination_point_scalar(location.lat, location.lon, bearing, length)
+            leg_end = None
+            next_telemetry = run.clock.now
+            while leg_end is None or run.clock.now < leg_end + hold:
+                if leg_end is None and haversine_scalar(location.lat, location.lon, *scout.target) <= scout.acceptance_radius \
+                        and scout.groundspeed < 0.1:
+                    leg_end = run.clock.now
+                if run.clock.now >= next_telemetry:
+                    run.follow(scout_controller)
+                    next_telemetry += telemetry_interval
+                advance(run.clock, (scout, run.follower), dt)
+                location = scout.location.global_frame
+
+    return run.results()
+
+def check_follow(results, expected):
+    # List of failed checks; the invariants hold for any log, the expected values only for the default one
+    failures = []
+    if results['published'] != results['positions']:
+        failures.append(f"{results['positions']} positions but {results['published']} payloads published")
+    if results['decode_mismatches']:
+        failures.append(f"{results['decode_mismatches']} payloads did not decode to the published position")
+    for key, value in (expected or {}).items():
+        if key == 'mean_distance':
+            if abs(results[key] - value) > 0.5:
+                failures.append(f"{key}: expected {value} m, got {results[key]} m")
+        elif results[key] != value:
+            failures.append(f"{key}: expected {value}, got {results[key]}")
+    return failures
+
+def main():
+    # Benchmark the telemetry path (get_telemetry + payload encoding) on a recorded session,
+    # or replay it through MQTTHandler.publish() and follow_scout() with --follow
+    from vessel_controller import VesselController
+    from telemetry_codec import encode_payload
+
+    parser = argparse.ArgumentParser(description='Replay a MAVLink tlog through VesselController')
+    parser.add_argument('tlog', nargs='?', default=DEFAULT_TLOG, help='Path to the tlog (default: 5_proj/mav.tlog)')
+    parser.add_argument('--speed', type=float, default=0,
+                       help='1 = real time, N = N times faster, 0 = as fast as possible (default)')
+    parser.add_argument('--encoding', choices=['json', 'binary'], default='json', help='Payload encoding to benchmark')
+    parser.add_argument('--follow', action='store_true',
+                        help='Replay through MQTTHandler.publish() (stub client) and a follower\'s follow_scout()')
+    parser.add_argument('--check', action='store_true',
+                        help='With --follow: exit with status 1 if the results differ from the recorded ones')
+    args = parser.parse_args()
+
+    if args.follow:
+        failures = []
+        for segment, run_segment in (('tlog', lambda: replay_follow(args.tlog, args.encoding)),
+                                     ('course', lambda: follow_course(args.encoding))):
+            start_time = time.perf_counter()
+            results = run_segment()
+            print(f"Follow {segment} ({args.encoding}) in {time.perf_counter() - start_time:.2f} s: {results}")
+            expected = EXPECTED_FOLLOW[segment][args.encoding]
+            if segment == 'tlog' and not os.path.samefile(args.tlog, DEFAULT_TLOG):
+                expected = None
+            failures += [f"{segment}: {failure}" for failure in check_follow(results, expected)]
+        if args.check:
+            for failure in failures:
+                print(f"FAIL: {failure}")
+            if failures:
+                sys.exit(1)
+            print("OK: follow replay matches the recorded behaviour")
+        return
+
+    replay = TlogReplay(args.tlog, args.speed)
+    vessel_controller = VesselController('SCOUT', vehicle=replay.vehicle)
+
+    samples = 0
+    payload_bytes = 0
+    telemetry_time = 0
+    start_time = time.perf_counter()
+    for msg in replay.replay():
+        if msg.get_type() != 'GLOBAL_POSITION_INT':
+            continue
+        sample_start = time.perf_counter()
+        telemetry_data = vessel_controller.get_telemetry()
+        telemetry_data['boat'] = 'scout'
+        payload_bytes += len(encode_payload(telemetry_data, args.encoding))
+        telemetry_time += time.perf_counter() - sample_start
+        samples += 1
+    elapsed = time.perf_counter() - start_time
+
+    print(f"Replayed {replay.messages} messages ({replay.duration():.1f} s of log) in {elapsed:.2f} s")
+    if samples:
+        print(f"{samples} telemetry samples, {telemetry_time / samples * 1e6:.1f} us per get_telemetry + {args.encoding} encode, "
+              f"{payload_bytes / samples:.1f} bytes per payload")
+
+if __name__ == "__main__":
+    main()
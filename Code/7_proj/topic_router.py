@@ -0,0 +1,122 @@
+import json
+import time
+
+def decode_command(data):
+    # Commands arrive as {"command": "follow"} or as plain text "follow"
+    try:
+        payload = json.loads(data.decode())
+    except json.JSONDecodeError:
+        return data.decode().strip().lower()
+    if isinstance(payload, dict):
+        return str(payload.get('command', '')).lower()
+    return str(payload).strip().lower()
+
+def vessel_position_handler(update):
+    # Routed handler for every position topic, calling update(userdata, vessel, sample, sample_time) per fix.
+    # The topic identifies the vessel. With a SampleClock in userdata['sample_clock'], publisher times are
+    # mapped onto the local clock (a vessel whose clock is off is warned about once, past userdata['max_skew']);
+    # without one every sample gets the time of receipt.
+    def on_vessel_position(samples, userdata, msg):
+        receive_time = time.time()
+        sample_clock = userdata.get('sample_clock')
+        for sample in samples:
+            if 'latitude' in sample and 'longitude' in sample:
+                sample_time = sample_clock.local_time(msg.topic, sample, receive_time) if sample_clock is not None else receive_time
+                update(userdata, msg.topic, sample, sample_time)
+        if sample_clock is not None and sample_clock.check_skew(msg.topic, userdata.get('max_skew', 30.0)):
+            print(f"Warning: {msg.topic} timestamps are {-sample_clock.offset(msg.topic):+.0f} s off this clock; "
+                  f"mapping them onto the time of receipt")
+    return on_vessel_position
+
+class TopicNode:
+    # One level of the wildcard trie
+    __slots__ = ('children', 'routes', 'multi_level_routes')
+
+    def __init__(self):
+        self.children = {}
+        self.routes = []              # Filters ending exactly at this level
+        self.multi_level_routes = []  # Filters ending with '#' at this level
+
+class TopicRouter:
+    """
+    Topic -> (decoder, handler) table built once at subscribe time.
+
+    Exact topics live in a dict and MQTT wildcard filters ('+', '#') in a
+    trie. The routes matching a concrete topic are cached the first time it
+    is seen, so dispatching a message is a single dict lookup: no lowercasing,
+    no key probing and one decode per decoder. Handlers are called as
+    `handler(decoded_value, userdata, msg)`.
+    """
+
+    def __init__(self):
+        self.exact = {}
+        self.wildcards = TopicNode()
+        self.cache = {}
+
+    def add(self, topic_filter, handler, decoder=None):
+        route = (decoder, handler)
+        if '+' in topic_filter or '#' in topic_filter:
+            self.add_wildcard(topic_filter, route)
+        else:
+            self.exact.setdefault(topic_filter, []).append(route)
+        # New routes can change what any cached topic resolves to
+        self.cache.clear()
+
+    def add_wildcard(self, topic_filter, route):
+        node = self.wildcards
+        levels = topic_filter.split('/')
+        for i, level in enumerate(levels):
+            if level == '#':
+                if i != len(levels) - 1:
+                    raise ValueError(f"'#' must be the last level of a topic filter: {topic_filter}")
+                node.multi_level_routes.append(route)
+                return
+            node = node.children.setdefault(level, TopicNode())
+        node.routes.append(route)
+
+    def match(self, topic):
+        # Resolve every route for a concrete topic (exact first, then wildcards)
+        routes = list(self.exact.get(topic, ()))
+        self.match_levels(self.wildcards, topic.split('/'), 0, routes)
+        return routes
+
+    def match_levels(self, node, levels, index, routes):
+        # '#' also matches the parent level ('a/#' matches 'a'), but not topics starting with '$'
+        if not (index == 0 and levels[0].startswith('$')):
+            routes.extend(node.multi_level_routes)
+        if index == len(levels):
+            routes.extend(node.routes)
+            return
+        child = node.children.get(levels[index])
+        if child is not None:
+            self.match_levels(child, levels, index + 1, routes)
+        if not (index == 0 and levels[0].startswith('$')):
+            child = node.children.get('+')
+            if child is not None:
+                self.match_levels(child, levels, index + 1, routes)
+
+    def routes_for(self, topic):
+        routes = self.cache.get(topic)
+        if routes is None:
+            routes = self.cache[topic] = self.match(topic)
+        return routes
+
+    def dispatch(self, client, userdata, msg):
+        # paho on_message callback
+        routes = self.routes_for(msg.topic)
+        if not routes:
+            print(f"No route for message on topic {msg.topic}")
+            return
+
+        decoded = {}
+        for decoder, handler in routes:
+            try:
+                if decoder not in decoded:
+                    decoded[decoder] = decoder(msg.payload) if decoder else msg.payload
+            except Exception as e:
+                print(f"Received invalid message on topic {msg.topic}: {e}")
+                continue
+            try:
+                handler(decoded[decoder], userdata, msg)
+            except Exception as e:
+                print(f"Error processing message on topic {msg.topic}: {e}")
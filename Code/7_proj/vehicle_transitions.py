@@ -0,0 +1,105 @@
+import threading
+from concurrent.futures import Future
+from dronekit import VehicleMode
+from pymavlink import mavutil
+
+class TransitionRejected(Exception):
+    # Raised when the autopilot answers a state change with a negative COMMAND_ACK
+    pass
+
+class StateTransition:
+    """
+    A vehicle state change tracked by a concurrent.futures.Future.
+
+    The future is resolved by a DroneKit attribute listener as soon as
+    `condition()` holds, instead of polling once per second. It fails with
+    TimeoutError when the deadline passes and with TransitionRejected when
+    the autopilot rejects `ack_command`. Every COMMAND_ACK for that command
+    is also passed to the `on_ack(msg)` hooks. Use asyncio.wrap_future() to
+    await it from an event loop.
+    """
+
+    def __init__(self, vehicle, attribute, condition, description, timeout=None, ack_command=None, on_ack=None):
+        self.vehicle = vehicle
+        self.attribute = attribute
+        self.condition = condition
+        self.description = description
+        self.ack_command = ack_command
+        self.on_ack = list(on_ack or [])
+        self.future = Future()
+        self.timer = None
+
+        self.future.add_done_callback(self.schedule_cleanup)
+        vehicle.add_attribute_listener(attribute, self.on_attribute)
+        if ack_command is not None:
+            vehicle.add_message_listener('COMMAND_ACK', self.on_command_ack)
+        if timeout is not None:
+            self.timer = threading.Timer(timeout, self.expire, args=(timeout,))
+            self.timer.daemon = True
+            self.timer.start()
+
+    def check(self):
+        # Resolve the future if the vehicle is already in the target state
+        if self.condition() and not self.future.done():
+            try:
+                self.future.set_result(True)
+            except Exception:
+                pass  # Resolved concurrently by another callback
+
+    def on_attribute(self, vehicle, attr_name, value):
+        self.check()
+
+    def on_command_ack(self, vehicle, name, msg):
+        if msg.command != self.ack_command:
+            return
+        for hook in self.on_ack:
+            try:
+                hook(msg)
+            except Exception as e:
+                print(f"Error in COMMAND_ACK hook: {e}")
+        if msg.result not in (mavutil.mavlink.MAV_RESULT_ACCEPTED, mavutil.mavlink.MAV_RESULT_IN_PROGRESS):
+            self.fail(TransitionRejected(f"Autopilot rejected {self.description} (MAV_RESULT {msg.result})"))
+
+    def expire(self, timeout):
+        self.fail(TimeoutError(f"Timed out after {timeout} s waiting for {self.description}"))
+
+    def fail(self, error):
+        if not self.future.done():
+            try:
+                self.future.set_exception(error)
+            except Exception:
+                pass  # Resolved concurrently by another callback
+
+    def schedule_cleanup(self, future):
+        # The future is usually resolved from inside a DroneKit listener, and removing
+        # listeners while DroneKit iterates over them can skip others, so detach later
+        threading.Thread(target=self.cleanup, daemon=True).start()
+
+    def cleanup(self):
+        if self.timer is not None:
+            self.timer.cancel()
+        self.vehicle.remove_attribute_listener(self.attribute, self.on_attribute)
+        if self.ack_command is not None:
+            self.vehicle.remove_message_listener('COMMAND_ACK', self.on_command_ack)
+
+def request_arm(vehicle, timeout=None, on_ack=None):
+    # Arm the vehicle without blocking; returns a Future resolved once it reports armed
+    transition = StateTransition(
+        vehicle, 'armed', lambda: vehicle.armed, "vehicle to arm", timeout,
+        mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM, on_ack
+    )
+    if not vehicle.armed:
+        vehicle.armed = True
+    transition.check()
+    return transition.future
+
+def request_mode(vehicle, mode_name, timeout=None, on_ack=None):
+    # Change flight mode without blocking; returns a Future resolved once the mode is reported
+    transition = StateTransition(
+        vehicle, 'mode', lambda: vehicle.mode.name == mode_name, f"{mode_name} mode", timeout,
+        mavutil.mavlink.MAV_CMD_DO_SET_MODE, on_ack
+    )
+    if vehicle.mode.name != mode_name:
+        vehicle.mode = VehicleMode(mode_name)
+    transition.check()
+    return transition.future
@@ -2,23 +2,40 @@ from dronekit import connect, VehicleMode, LocationGlobalRelative
 from datetime import datetime
 import os
 from dotenv import load_dotenv
-from math import radians, sin, cos, sqrt, atan2
+import threading
 import time
-from collections import deque
+from math import radians, sin, cos
+from vehicle_transitions import request_arm, request_mode
+from geodesy import LocalTangentPlane
+from goto_shaper import GotoShaper
+from position_streamer import PositionTargetStreamer
+from telemetry_ring import TelemetryRing
 
 # Load environment variables
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
 class VesselController:
-    def __init__(self, role):
+    def __init__(self, role, vehicle=None, clock=None):
         self.role = role.upper()  # Convert role to uppercase for consistency
+        self.clock = clock or time.time  # Time source for the goto/report timers (a virtual clock in simulations)
         self.following = False
-        self.last_scout_distance = None
-        self.last_goto_time = time.time()
-        self.last_goto_position = None
+        self.follow_lock = threading.Lock()  # Orders follow_scout() against stop_following() across threads
         self.last_report_time = 0
         self.report_interval = 3  # Report every 3 seconds
-        self.scout_speeds = deque(maxlen=3)  # Store last 3 speed readings
+        # Deduplicates and rate-limits goto commands (one per 10 s on average, bursts of 2)
+        self.goto_shaper = GotoShaper(self.send_goto, clock=self.clock)
+        # A timer sends gotos the shaper held back; simulations on a virtual clock call flush_goto() themselves
+        self.goto_timer = None
+        self.timed_goto_flush = clock is None
+        self.position_streamer = None  # Set by start_streaming() to steer with streamed position targets instead
+        self.frame = None  # Local tangent plane used by the follow math, anchored at the vessel's first fix
+        self.reanchor_distance = 2000  # Move the anchor once the vessel is this many meters from it
+        self.history = TelemetryRing(300)  # Last 300 telemetry samples of this vessel (24 KiB, constant)
+        
+        # A vehicle-like object (a tlog replay or a FakeVehicle) can be passed in instead of connecting
+        if vehicle is not None:
+            self.vehicle = vehicle
+            return
         
         # Get the connection string based on the role
         connection_string = self.get_connection_string()
@@ -46,58 +63,76 @@ class VesselController:
             "latitude": self.vehicle.location.global_frame.lat,
             "longitude": self.vehicle.location.global_frame.lon
         }
+        self.history.append_sample(telemetry_data, self.clock())
         
         return telemetry_data
     
-    def arm_vehicle(self):
+    def request_arm(self, timeout=None, on_ack=None):
+        # Non-blocking arm: returns a Future resolved by the 'armed' attribute listener
+        return request_arm(self.vehicle, timeout, on_ack)
+    
+    def request_mode(self, mode_name, timeout=None, on_ack=None):
+        # Non-blocking mode change: returns a Future resolved by the 'mode' attribute listener
+        return request_mode(self.vehicle, mode_name, timeout, on_ack)
+    
+    def arm_vehicle(self, timeout=None):
         # Arm the vehicle if it's not already armed
         if not self.vehicle.armed:
             print("Arming vehicle...")
-            self.vehicle.armed = True
-            while not self.vehicle.armed:
-                time.sleep(1)
+            self.request_arm(timeout).result()
             print("Vehicle armed.")
     
     def calculate_distance(self, lat1, lon1, lat2, lon2):
-        # Calculate the great circle distance between two points on earth
-        R = 6371000  # Earth radius in meters
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1-a))
-        
-        return R * c
+        # Distance in meters between two points near the vessel, in its local tangent plane
+        return self.local_frame().distance(lat1, lon1, lat2, lon2)
+    
+    def local_frame(self):
+        # Cached projection around the vessel; distances in it are a few multiplies instead of haversine
+        location = self.vehicle.location.global_frame
+        if self.frame is None:
+            self.frame = LocalTangentPlane(location.lat, location.lon)
+        else:
+            east, north = self.frame.to_local(location.lat, location.lon)
+            if east * east + north * north > self.reanchor_distance ** 2:
+                self.frame = LocalTangentPlane(location.lat, location.lon)
+        return self.frame
     
     def report_status(self, distance):
-        current_time = time.time()
+        current_time = self.clock()
         if current_time - self.last_report_time >= self.report_interval:
             mode = "LOITERING" if self.following and distance < 5 else \
                    "STOPPED" if not self.following else "FOLLOWING"
             print(f"Distance to scout: {distance:.2f} meters. Mode: {mode}")
             self.last_report_time = current_time
     
-    def scout_has_moved(self, scout_lat, scout_lon, scout_speed):
-        if self.last_goto_position is None:
-            return True
-        
-        distance_moved = self.calculate_distance(
-            self.last_goto_position[0], self.last_goto_position[1],
-            scout_lat, scout_lon
-        )
-        
-        self.scout_speeds.append(scout_speed)
-        avg_speed = sum(self.scout_speeds) / len(self.scout_speeds)
-        
-        # Consider scout moved if position changed >4m OR average speed >0.5 m/s
-        return distance_moved > 4 or avg_speed > 0.5
+    def send_goto(self, lat, lon):
+        # Called by the goto shaper for every command that gets through
+        self.vehicle.simple_goto(LocationGlobalRelative(lat, lon, 0))
+    
+    def start_streaming(self, rate=5.0, run_thread=True):
+        # Steer with SET_POSITION_TARGET_GLOBAL_INT at `rate` Hz instead of goto commands
+        self.position_streamer = PositionTargetStreamer(self.vehicle, rate, clock=self.clock)
+        if run_thread:
+            self.position_streamer.start()
+        return self.position_streamer
+    
+    def steer_to(self, lat, lon, speed, heading):
+        # Streamed target with the scout's velocity as feed-forward, or a shaped goto command
+        if self.position_streamer is not None:
+            if heading is None:
+                self.position_streamer.set_target(lat, lon)
+            else:
+                self.position_streamer.set_target(lat, lon, speed * cos(radians(heading)), speed * sin(radians(heading)))
+            return False
+        return self.goto_shaper.request(lat, lon)
     
-    def follow_scout(self, scout_lat, scout_lon, scout_speed):
-        current_time = time.time()
+    def follow_scout(self, scout_lat, scout_lon, scout_speed, scout_heading=None, aim_lat=None, aim_lon=None):
+        # Distance checks and reports use the scout's position; steering goes to the aim point
+        # (e.g. an intercept point ahead of the scout), or to the scout itself if none is given
+        if aim_lat is None or aim_lon is None:
+            aim_lat, aim_lon = scout_lat, scout_lon
         
-        # Calculate distance to scout
+        # Calculate distance to scout in the local frame (meters)
         current_distance = self.calculate_distance(
             self.vehicle.location.global_frame.lat,
             self.vehicle.location.global_frame.lon,
@@ -106,53 +141,73 @@ class VesselController:
         
         self.report_status(current_distance)
         
-        if self.following:
+        # Checked under the lock, so a follow step that races stop_following() cannot switch back to GUIDED
+        with self.follow_lock:
+            if not self.following:
+                return
             # Check if too close to scout
             if current_distance < 5:
                 if self.vehicle.mode.name != "LOITER":
                     self.vehicle.mode = VehicleMode("LOITER")
                     print("Too close to scout. Loitering to maintain position.")
+                    if self.position_streamer is not None:
+                        self.position_streamer.hold()
             else:
                 # Resume following if needed
                 if self.vehicle.mode.name != "GUIDED":
                     self.vehicle.mode = VehicleMode("GUIDED")
                     print("Resuming follow mode.")
-                
-                # Determine if we should issue a new goto command
-                should_update = (
-                    self.last_goto_position is None or
-                    current_time - self.last_goto_time >= 15 or
-                    current_distance > self.last_scout_distance + 5
-                )
-                
-                if should_update and self.scout_has_moved(scout_lat, scout_lon, scout_speed):
-                    print(f"Issuing new goto command. Distance to scout: {current_distance:.2f} meters")
-                    self.vehicle.simple_goto(LocationGlobalRelative(scout_lat, scout_lon, 0))
-                    self.last_goto_time = current_time
-                    self.last_goto_position = (scout_lat, scout_lon)
-                    self.last_scout_distance = current_distance
-    
-    def set_guided_mode(self):
+                    # Entering GUIDED clears the autopilot's target, so the next goto must go out
+                    self.goto_shaper.forget_target()
+            
+                # Streamed targets go out at a fixed rate; gotos are deduplicated and rate-limited by the shaper
+                if self.steer_to(aim_lat, aim_lon, scout_speed, scout_heading):
+                    print(f"Issued new goto command. Distance to scout: {current_distance:.2f} meters")
+                elif self.timed_goto_flush:
+                    self.schedule_goto_flush()
+    
+    def schedule_goto_flush(self):
+        # Arm a timer for when the shaper can send its held target (call with follow_lock held)
+        delay = self.goto_shaper.ready_in()
+        if delay is None or (self.goto_timer is not None and self.goto_timer.is_alive()):
+            return
+        self.goto_timer = threading.Timer(delay, self.flush_goto)
+        self.goto_timer.daemon = True
+        self.goto_timer.start()
+    
+    def flush_goto(self):
+        # Send a goto the shaper held back for lack of tokens, if the vessel is still following in GUIDED
+        with self.follow_lock:
+            self.goto_timer = None
+            if not self.following or self.vehicle.mode.name != "GUIDED":
+                return
+            if self.goto_shaper.poll():
+                print("Issued held goto command.")
+            elif self.timed_goto_flush:
+                self.schedule_goto_flush()
+    
+    def set_guided_mode(self, timeout=None):
         # Set the vehicle mode to GUIDED and initialize following state
-        self.vehicle.mode = VehicleMode("GUIDED")
-        while self.vehicle.mode.name != "GUIDED":
-            time.sleep(1)
+        self.request_mode("GUIDED", timeout).result()
         print("Vehicle is in GUIDED mode. Started following.")
-        self.following = True
+        with self.follow_lock:
+            self.following = True
     
-    def stop_following(self):
-        # Stop following by switching to LOITER mode
-        self.vehicle.mode = VehicleMode("LOITER")
-        while self.vehicle.mode.name != "LOITER":
-            time.sleep(1)
+    def stop_following(self, timeout=None):
+        # Stop following first, so no follow step in flight can undo the LOITER request
+        with self.follow_lock:
+            self.following = False
+            self.goto_shaper.reset()
+            if self.position_streamer is not None:
+                self.position_streamer.hold()
+        self.request_mode("LOITER", timeout).result()
         print("Vehicle is in LOITER mode. Stopped following.")
-        self.following = False
-        self.last_scout_distance = None
-        self.last_goto_time = None
-        self.last_goto_position = None
-        self.scout_speeds.clear()
     
     # Function to close the vehicle connection
     def close_connection(self):
+        if self.goto_timer is not None:
+            self.goto_timer.cancel()
+        if self.position_streamer is not None:
+            self.position_streamer.stop()
         self.vehicle.close()
         print("Vehicle connection closed.")
\ No newline at end of file
@@ -6,8 +6,8 @@ def main():
     # Initialize MQTT (reuse from previous projects)
     mqtt_handler = MQTTHandler('SCOUT')
     
-    # Create mission manager
-    mission_mgr = MissionManager(vehicle, mqtt_handler)
+    # Create mission manager, checking missions against the Syros fences
+    mission_mgr = MissionManager(vehicle, mqtt_handler, GeofenceSet.load('syros_fences.txt'))
     
     # Load mission
     mission_mgr.load_mission_from_file('syros_patrol.txt')
@@ -1,14 +1,17 @@
 # mission_manager.py (conceptual outline)
-from dronekit import connect, VehicleMode, Command
+from dronekit import connect, Command
 import time
 from mqtt_handler import MQTTHandler  # Reuse from previous projects
 from pymavlink import mavutil
+from vehicle_transitions import request_arm, request_mode  # Reuse from Project 7
+from geodesy import path_length  # Reuse from Project 7
 
 class MissionManager:
-    def __init__(self, vehicle, mqtt_handler):
+    def __init__(self, vehicle, mqtt_handler, geofences=None):
         self.vehicle = vehicle
         self.mqtt_handler = mqtt_handler
         self.mission_waypoints = []
+        self.geofences = geofences  # Optional GeofenceSet every loaded mission must respect
     
     
     
@@ -20,7 +23,8 @@ class MissionManager:
         1. Open and read the file
         2. Parse each line (skip comments starting with #)
         3. Extract lat, lon, alt values
-        4. Store in mission_waypoints list
+        4. Check all waypoints against the geofences in one pass
+        5. Store in mission_waypoints list
         """
         waypoints = []
         
@@ -37,6 +41,18 @@ class MissionManager:
                     # - Parse coordinates
                     lat, lon, alt = map(float, parts)
                     waypoints.append((lat, lon, alt))
+
+            # - Reject missions that leave an inclusion fence or enter an exclusion fence
+            if self.geofences is not None:
+                breaches = self.geofences.check_mission(waypoints)
+                if breaches:
+                    print(f"Mission rejected, {len(breaches)} geofence breaches: {breaches[:5]}")
+                    self.mqtt_handler.publish({
+                        "type": "mission_rejected",
+                        "waypoint_count": len(waypoints),
+                        "geofence_breaches": [{"waypoint": index, "fence": name} for index, name in breaches]
+                    })
+                    return []
             self.mission_waypoints = waypoints
 
             # - Publish mission_loaded message
@@ -53,6 +69,20 @@ class MissionManager:
     
     
     
+    def estimate_mission_distance(self):
+        """
+        Total length of the mission in metres
+        
+        All legs are measured in one vectorized haversine pass over the
+        waypoint coordinates (altitude is ignored on the water).
+        """
+        if len(self.mission_waypoints) < 2:
+            return 0
+        lats, lons, _ = zip(*self.mission_waypoints)
+        return round(float(path_length(lats, lons)[-1]), 1)
+    
+    
+    
     def upload_mission_to_vehicle(self):
         """
         Upload waypoints to vehicle using DroneKit commands
@@ -100,24 +130,26 @@ class MissionManager:
         
     
     
-    def start_mission(self):
+    def start_mission(self, timeout=30):
         """
         Arm vehicle and set AUTO mode
+        
+        Both transitions are requested at once and resolved by attribute
+        listeners; a rejected or stalled transition raises instead of
+        hanging (TransitionRejected / TimeoutError after `timeout` seconds).
         """
-        # Arm vehicle if not armed
+        # Arm vehicle; request_arm() is idempotent and resolves at once if it is already armed
         if not self.vehicle.armed:
             print("Arming vehicle...")
-            self.vehicle.armed = True
-            # Wait for arming
-            while not self.vehicle.armed:
-                time.sleep(1)
+        arming = request_arm(self.vehicle, timeout)
             
         # Set AUTO mode
         print("Setting AUTO mode...")
-        self.vehicle.mode = VehicleMode("AUTO")
-        # Wait for mode change
-        while self.vehicle.mode.name != "AUTO":
-            time.sleep(1)
+        auto_mode = request_mode(self.vehicle, "AUTO", timeout)
+        
+        # Wait for both transitions
+        arming.result()
+        auto_mode.result()
 
         self.mission_start_time = time.time()
     